@@ -0,0 +1,39 @@
+"""
+SQLite backend with per-connection tuning.
+
+Extra ``OPTIONS`` understood on top of Django's sqlite3 backend:
+
+``pragmas``
+    ``{name: value}`` run as ``PRAGMA name = value`` on every new connection,
+    e.g. ``journal_mode``, ``synchronous``, ``mmap_size``.
+``transaction_mode``
+    ``'IMMEDIATE'`` makes ``atomic()`` take the write lock when it starts.
+    With the default deferred mode a transaction that reads and then writes
+    fails with "database is locked" straight away, without waiting for the
+    busy timeout, whenever another connection wrote in between.
+
+Use ``timeout`` (seconds) for the busy timeout, as with the stock backend.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.pragmas = kwargs.pop('pragmas', {})
+        self.transaction_mode = kwargs.pop('transaction_mode', 'DEFERRED').upper()
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(f"transaction_mode must be one of {', '.join(TRANSACTION_MODES)}")
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
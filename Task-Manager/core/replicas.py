@@ -0,0 +1,121 @@
+"""
+Read replicas.
+
+``PrimaryReplicaRouter`` sends reads to one of ``DATABASE_REPLICAS`` only
+while ``ReplicaRoutingMiddleware`` has marked the current request as safe to
+serve from a replica: a GET/HEAD/OPTIONS request from a client that has not
+written anything in the last ``REPLICA_PIN_SECONDS``. Everything else, all
+writes, and all code running outside a request (management commands,
+migrations, the shell) uses ``default``.
+
+After a write the client is pinned to the primary for a while so it reads its
+own writes while the replicas catch up: browsers through a short-lived cookie,
+token clients through the default cache, keyed on their Authorization header.
+That cache has to be shared by all workers (``DJANGO_CACHE_DIR``), or the next
+request may land on a worker that never saw the pin.
+"""
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+PIN_COOKIE = 'db_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Apps whose rows must never be read stale
+PRIMARY_ONLY_APPS = ('sessions',)
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_pinned = ContextVar('pinned_to_primary', default=False)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+@contextmanager
+def pin_primary():
+    """Read from the primary inside this block, even while serving requests."""
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and not _pinned.get() and model._meta.app_label not in PRIMARY_ONLY_APPS and replicas():
+            return random.choice(replicas())
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas are copies of the primary, never migrated on their own
+        return db == 'default'
+
+
+def route_stream(response, replica_reads):
+    """``response``'s streaming content, read with ``replica_reads`` in effect."""
+    content = response.streaming_content
+    if response.is_async:
+        async def stream():
+            token = _replica_reads.set(replica_reads)
+            try:
+                async for chunk in content:
+                    yield chunk
+            finally:
+                _replica_reads.reset(token)
+    else:
+        def stream():
+            token = _replica_reads.set(replica_reads)
+            try:
+                yield from content
+            finally:
+                _replica_reads.reset(token)
+    return stream()
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token_key = self.token_pin_key(request)
+        pinned = (
+            _pinned.get()
+            or PIN_COOKIE in request.COOKIES
+            or (token_key is not None and cache.get(token_key) is not None)
+        )
+        replica_reads = request.method in SAFE_METHODS and not pinned
+        token = _replica_reads.set(replica_reads)
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica_reads.reset(token)
+        if response.streaming:
+            # Streamed content is read after this returns
+            response.streaming_content = route_stream(response, replica_reads)
+
+        if request.method not in SAFE_METHODS and replicas():
+            pin_seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(PIN_COOKIE, '1', max_age=pin_seconds, httponly=True, samesite='Lax')
+            if token_key is not None:
+                cache.set(token_key, 1, pin_seconds)
+        return response
+
+    def token_pin_key(self, request):
+        authorization = request.headers.get('Authorization')
+        if not authorization:
+            return None
+        return 'db:pin:' + hashlib.sha256(authorization.encode()).hexdigest()
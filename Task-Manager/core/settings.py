@@ -18,16 +18,32 @@ import os
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
-# Quick-start development settings - unsuitable for production
+# Settings that differ between a developer machine and a deployment come from
+# the environment. DJANGO_ENV=production turns debugging off and requires a
+# real secret key.
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
+from django.core.exceptions import ImproperlyConfigured
+
+DJANGO_ENV = os.environ.get('DJANGO_ENV', 'development')
+PRODUCTION = DJANGO_ENV == 'production'
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-ci(7*rv33$m_5*w*fmteco1)8r#-0fhmpajg61uc27k-u+gtlp'
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY')
+if not SECRET_KEY:
+    if PRODUCTION:
+        raise ImproperlyConfigured('DJANGO_SECRET_KEY must be set when DJANGO_ENV=production')
+    SECRET_KEY = 'django-insecure-ci(7*rv33$m_5*w*fmteco1)8r#-0fhmpajg61uc27k-u+gtlp'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# With DEBUG on Django also keeps every SQL query of a request in memory.
+DEBUG = os.environ.get('DJANGO_DEBUG', '0' if PRODUCTION else '1') == '1'
+
+ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', '0.0.0.0,localhost,127.0.0.1').split(',')
+CSRF_TRUSTED_ORIGINS = [origin for origin in os.environ.get('DJANGO_CSRF_TRUSTED_ORIGINS', '').split(',') if origin]
 
-ALLOWED_HOSTS = ['0.0.0.0', 'localhost', '127.0.0.1']
+if PRODUCTION:
+    SESSION_COOKIE_SECURE = os.environ.get('DJANGO_SECURE_COOKIES', '1') == '1'
+    CSRF_COOKIE_SECURE = SESSION_COOKIE_SECURE
 
 
 # Application definition
@@ -45,6 +61,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.replicas.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -52,6 +69,10 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+if PRODUCTION:
+    # With DEBUG off nothing else serves the collected static files (the admin
+    # CSS); docker-entrypoint.sh runs collectstatic
+    MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
 
 ROOT_URLCONF = 'core.urls'
 
@@ -66,24 +87,115 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'tasks.context_processors.roles',
+                'tasks.context_processors.task_events',
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+ASGI_APPLICATION = 'core.asgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
+# DJANGO_SQLITE_PROFILE=tuned (the default) uses the backend in
+# core/backends/sqlite3 with WAL journaling and a busy timeout so concurrent
+# writers wait for each other instead of failing with "database is locked",
+# and keeps connections open between requests. DJANGO_SQLITE_PROFILE=default
+# is Django's stock sqlite3 setup.
+SQLITE_PROFILES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
+    },
+    'tuned': {
+        'ENGINE': 'core.backends.sqlite3',
+        # Persistent connections suit threads that serve request after
+        # request; ASGI runs each request in a new thread, so the entrypoint
+        # turns them off there
+        'CONN_MAX_AGE': int(os.environ.get('DJANGO_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                # Readers no longer block the writer and vice versa
+                'journal_mode': 'WAL',
+                # Safe with WAL: a power loss can only lose the last commits
+                'synchronous': 'NORMAL',
+                'mmap_size': 256 * 1024 * 1024,
+                'cache_size': -64 * 1024,
+                'temp_store': 'MEMORY',
+            },
+        },
+    },
+}
+SQLITE_PROFILE = os.environ.get('DJANGO_SQLITE_PROFILE', 'tuned')
+
+DATABASES = {
+    'default': {
+        **SQLITE_PROFILES[SQLITE_PROFILE],
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
 
+# Read replicas: DJANGO_DB_REPLICAS is a comma-separated list of SQLite files
+# kept in step with the primary (see the sync_replica command). Safe requests
+# read from them; see core/replicas.py. Other engines can be added to
+# DATABASES and listed in DATABASE_REPLICAS the same way.
+DATABASE_REPLICAS = []
+for number, path in enumerate(filter(None, os.environ.get('DJANGO_DB_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica{number}'] = {**DATABASES['default'], 'NAME': path, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['core.replicas.PrimaryReplicaRouter']
+# How long a client reads from the primary after writing, to cover replica lag
+REPLICA_PIN_SECONDS = int(os.environ.get('DJANGO_REPLICA_PIN_SECONDS', 10))
+
+# Deleted-task markers for /tasks/changes/ are pruned after this many days
+# (manage.py prune_tombstones); older cursors get a full resync.
+TOMBSTONE_RETENTION_DAYS = int(os.environ.get('DJANGO_TOMBSTONE_RETENTION_DAYS', 30))
+
+
+# Caches
+# 'default' holds per-user state that every worker must agree on: roles,
+# token versions and the read-your-writes pins of token clients. 'tasks'
+# holds rendered task lists and API payloads (see tasks/caching.py); entries
+# are invalidated by version, so MAX_ENTRIES is what bounds them.
+# DJANGO_CACHE_DIR puts both in file caches shared by every process on the
+# host. The container and gunicorn.conf.py set it; without it each process
+# keeps its own local-memory caches, which is only right for a single process
+# such as runserver or the tests.
+TASK_CACHE_MAX_ENTRIES = int(os.environ.get('DJANGO_TASK_CACHE_MAX_ENTRIES', 5000))
+CACHE_DIR = os.environ.get('DJANGO_CACHE_DIR')
+if CACHE_DIR:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(CACHE_DIR, 'default'),
+            'OPTIONS': {'MAX_ENTRIES': TASK_CACHE_MAX_ENTRIES},
+        },
+        'tasks': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(CACHE_DIR, 'tasks'),
+            'TIMEOUT': None,
+            'OPTIONS': {'MAX_ENTRIES': TASK_CACHE_MAX_ENTRIES},
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'tasks': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'tasks',
+            'TIMEOUT': None,
+            'OPTIONS': {'MAX_ENTRIES': TASK_CACHE_MAX_ENTRIES},
+        },
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -120,6 +232,7 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -129,7 +242,15 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework and JWT config
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Trusts the roles and token version signed into our tokens instead
+        # of loading the user on every request
+        'tasks.authentication.ClaimsJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        # Same bytes as rest_framework.renderers.JSONRenderer, encoded with
+        # orjson when it is installed
+        'tasks.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
 }
 
@@ -142,4 +263,15 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': False,
     'ALGORITHM': 'HS256',
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'tasks.authentication.TaskTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'tasks.authentication.TaskTokenRefreshSerializer',
 }
+
+# Fan-out for the live task events stream (/events/tasks/). The in-process
+# broker only reaches clients connected to the process that made the change,
+# so run the stream on a single ASGI worker or plug in a shared broker.
+TASK_EVENTS_BROKER = 'tasks.events.InProcessBroker'
+# Whether the task list pages subscribe to the stream. Only turn it on when
+# every change reaches it: served by ASGI, with one worker or a shared
+# broker. docker-entrypoint.sh does for SERVER=asgi with one worker.
+TASK_EVENTS_LIVE = os.environ.get('DJANGO_TASK_EVENTS') == '1'
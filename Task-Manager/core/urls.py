@@ -2,12 +2,13 @@ from django.urls import path, include
 from django.contrib.auth.views import LogoutView
 from tasks.role_login import RoleBasedLoginView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from tasks.views import TaskListView, TaskUpdateView, TaskReportView, UserProfileView, UserTaskListView, UserTaskUpdateView, TaskDetailView
+from tasks.views import TaskListView, TaskBulkView, TaskSearchView, TaskChangesView, TaskDashboardView, TaskUpdateView as TaskAPIUpdateView, TaskReportView, UserProfileView, UserTaskListView, UserTaskUpdateView, TaskDetailView
+from tasks.async_views import AsyncTaskListView, AsyncTaskUpdateView, AsyncTaskReportView, TaskEventsView
 from tasks.admin_views import (
     UserListView, UserCreateView, UserUpdateView, UserDeleteView,
     AdminListView, AdminCreateView, AdminUpdateView, AdminDeleteView,
-    TaskListAdminView, TaskCreateView, TaskUpdateView, TaskDeleteView, TaskReportDetailView,
-    AssignUserToAdminView, AdminPromoteDemoteView, UnassignUserFromAdminView
+    TaskListAdminView, TaskExportView, TaskCreateView, TaskUpdateView, TaskDeleteView, TaskReportDetailView,
+    UserLookupView, AssignUserToAdminView, BulkAssignUserView, AdminPromoteDemoteView
 )
 from django.contrib import admin
 
@@ -24,8 +25,17 @@ urlpatterns = [
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('tasks/', TaskListView.as_view(), name='task_list'),
-    path('tasks/<int:pk>/', TaskUpdateView.as_view(), name='task_update'),
+    path('tasks/bulk/', TaskBulkView.as_view(), name='task_bulk'),
+    path('tasks/search/', TaskSearchView.as_view(), name='task_search'),
+    path('tasks/changes/', TaskChangesView.as_view(), name='task_changes'),
+    path('tasks/dashboard/', TaskDashboardView.as_view(), name='task_dashboard'),
+    path('tasks/<int:pk>/', TaskAPIUpdateView.as_view(), name='task_update'),
     path('tasks/<int:pk>/report/', TaskReportView.as_view(), name='task_report'),
+    # Async variants of the endpoints above, for ASGI deployments
+    path('api/async/tasks/', AsyncTaskListView.as_view(), name='async_task_list'),
+    path('api/async/tasks/<int:pk>/', AsyncTaskUpdateView.as_view(), name='async_task_update'),
+    path('api/async/tasks/<int:pk>/report/', AsyncTaskReportView.as_view(), name='async_task_report'),
+    path('events/tasks/', TaskEventsView.as_view(), name='task_events'),
     # Admin Panel
     path('admin/users/', UserListView.as_view(), name='user_list'),
     path('admin/users/create/', UserCreateView.as_view(), name='user_create'),
@@ -36,10 +46,12 @@ urlpatterns = [
     path('admin/admins/<int:pk>/update/', AdminUpdateView.as_view(), name='admin_update'),
     path('admin/admins/<int:pk>/delete/', AdminDeleteView.as_view(), name='admin_delete'),
     path('admin/admins/<int:pk>/<str:action>/', AdminPromoteDemoteView.as_view(), name='admin_promote_demote'),
+    path('admin/users/lookup/', UserLookupView.as_view(), name='user_lookup'),
     path('admin/users/assign/', AssignUserToAdminView.as_view(), name='assign_user'),
-    path('admin/users/unassign/', UnassignUserFromAdminView.as_view(), name='unassign_user'),
+    path('admin/users/assign/bulk/', BulkAssignUserView.as_view(), name='bulk_assign_user'),
     path('admin/tasks/', TaskListAdminView.as_view(), name='task_list_admin'),
     path('admin/tasks/create/', TaskCreateView.as_view(), name='task_create'),
+    path('admin/tasks/export/', TaskExportView.as_view(), name='task_export'),
     path('admin/tasks/<int:pk>/update/', TaskUpdateView.as_view(), name='task_update'),
     path('admin/tasks/<int:pk>/delete/', TaskDeleteView.as_view(), name='task_delete'),
     path('admin/tasks/<int:pk>/report/', TaskReportDetailView.as_view(), name='task_report_detail'),
@@ -0,0 +1,33 @@
+#!/bin/sh
+# Start the app in the mode picked by the environment:
+#   DEBUGPY=1    single runserver process with debugpy listening on 5678
+#   SERVER=asgi  Gunicorn with Uvicorn workers serving core.asgi (one by default)
+#   otherwise    Gunicorn with sync workers serving core.wsgi
+set -e
+
+if [ "$DEBUGPY" = "1" ]; then
+    exec python -Xfrozen_modules=off -m debugpy --listen 0.0.0.0:5678 manage.py runserver 0.0.0.0:8000
+fi
+
+if [ "$MIGRATE_ON_START" = "1" ]; then
+    python manage.py migrate --noinput
+fi
+
+if [ "$DJANGO_ENV" = "production" ]; then
+    # Served by WhiteNoise from STATIC_ROOT; DEBUG is off, so nothing else would
+    python manage.py collectstatic --noinput -v 0
+fi
+
+if [ "$SERVER" = "asgi" ]; then
+    # Each ASGI request runs in a fresh thread, so persistent connections
+    # would pile up instead of being reused
+    export DJANGO_CONN_MAX_AGE="${DJANGO_CONN_MAX_AGE:-0}"
+    # The in-process events broker only reaches clients of the worker that
+    # made a change, so the pages only subscribe when there is one worker
+    export GUNICORN_WORKERS="${GUNICORN_WORKERS:-1}"
+    if [ "$GUNICORN_WORKERS" = "1" ]; then
+        export DJANGO_TASK_EVENTS="${DJANGO_TASK_EVENTS:-1}"
+    fi
+    exec gunicorn core.asgi:application -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker "$@"
+fi
+exec gunicorn core.wsgi:application -c gunicorn.conf.py "$@"
@@ -0,0 +1,57 @@
+"""
+Gunicorn settings for the production profile.
+
+Every value can be overridden from the environment (``GUNICORN_*``) or the
+command line. ``SERVER=asgi`` in the container swaps in Uvicorn workers
+serving ``core.asgi``; see ``docker-entrypoint.sh``.
+
+Reloading: ``kill -HUP <master>`` replaces the workers gracefully with the
+current configuration. Because the app is preloaded in the master, picking
+up new code needs ``kill -USR2 <master>`` (starts a new master alongside the
+old one) followed by ``kill -QUIT <old master>`` once the new one is up.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+# The workers must share Django's caches (roles, token versions, task lists);
+# see CACHES in core/settings.py
+os.environ.setdefault('DJANGO_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'task-manager-cache'))
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Two workers per core plus one keeps every core busy while some workers
+# wait on the database or the network
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+
+# Load Django once in the master so workers fork with it already imported
+preload_app = True
+
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# Recycle workers now and then so slow leaks can't build up; the jitter stops
+# them all restarting at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 500))
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+
+def on_starting(server):
+    # Entries may predate changes made while no server was running
+    shutil.rmtree(os.environ['DJANGO_CACHE_DIR'], ignore_errors=True)
+
+
+def pre_fork(server, worker):
+    # Loading the app can touch the database; a connection opened in the
+    # master must not be shared by the forked workers
+    from django.db import connections
+
+    connections.close_all()
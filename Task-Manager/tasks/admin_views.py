@@ -1,21 +1,35 @@
+import csv
+import json
+
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView, View
 from django.contrib.auth.mixins import UserPassesTestMixin
-from django.urls import reverse_lazy
-from django.contrib.auth.models import User, Group
+from django.urls import reverse, reverse_lazy
+from django.contrib.auth.models import User
 from django.shortcuts import redirect, get_object_or_404, render
 from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponseBadRequest, JsonResponse, QueryDict, StreamingHttpResponse
+from django.db.models import Exists, OuterRef, Prefetch, prefetch_related_objects
+from django.utils.http import urlencode
 from .models import Task, UserProfile
-from .forms import TaskForm, UserForm, AdminForm, AssignUserForm
+from .forms import TaskForm, UserForm, AdminForm, BulkAssignUserForm
 from .forms import UserUpdateForm
+from .caching import CachedFragmentMixin
+from .conditional import VersionedUpdateMixin
+from .pagination import KeysetPaginationMixin, KeysetPaginator
+from .roles import ROLE_NAMES, has_role, role_group_id
+from .scoping import tasks_for, users_for
+from .search import search_tasks, search_users
 
 # Permission Mixins
 class SuperAdminRequiredMixin(UserPassesTestMixin):
     def test_func(self):
-        return self.request.user.groups.filter(name='SuperAdmin').exists()
+        return has_role(self.request.user, 'SuperAdmin')
 
 class AdminRequiredMixin(UserPassesTestMixin):
     def test_func(self):
-        return self.request.user.groups.filter(name__in=['Admin', 'SuperAdmin']).exists()
+        return has_role(self.request.user, 'Admin', 'SuperAdmin')
 
 # User Management (SuperAdmin Only)
 class UserListView(SuperAdminRequiredMixin, ListView):
@@ -23,9 +37,13 @@ class UserListView(SuperAdminRequiredMixin, ListView):
     template_name = 'users_list.html'
     context_object_name = 'users'
 
+    def get_queryset(self):
+        # The template shows each user's role
+        return User.objects.prefetch_related('groups')
+
     def dispatch(self, request, *args, **kwargs):
         # If user is Admin (not SuperAdmin), redirect to /admin/tasks/
-        if request.user.is_authenticated and request.user.groups.filter(name='Admin').exists():
+        if request.user.is_authenticated and has_role(request.user, 'Admin'):
             return redirect('task_list_admin')
         return super().dispatch(request, *args, **kwargs)
 
@@ -38,8 +56,7 @@ class UserCreateView(SuperAdminRequiredMixin, CreateView):
     def form_valid(self, form):
         response = super().form_valid(form)
         # Assign default 'User' group
-        user_group, _ = Group.objects.get_or_create(name='User')
-        self.object.groups.add(user_group)
+        self.object.groups.add(role_group_id('User'))
         return response
 
 
@@ -56,7 +73,7 @@ class UserDeleteView(SuperAdminRequiredMixin, DeleteView):
 
     def delete(self, request, *args, **kwargs):
         user = self.get_object()
-        if user.is_superuser or user.groups.filter(name='SuperAdmin').exists():
+        if user.is_superuser or has_role(user, 'SuperAdmin'):
             raise PermissionDenied("You cannot delete the superuser or a SuperAdmin.")
         return super().delete(request, *args, **kwargs)
 
@@ -67,7 +84,7 @@ class AdminListView(SuperAdminRequiredMixin, ListView):
     context_object_name = 'admins'
 
     def get_queryset(self):
-        return User.objects.filter(groups__name='Admin')
+        return User.objects.filter(groups__name='Admin').prefetch_related('groups')
 
 class AdminCreateView(SuperAdminRequiredMixin, CreateView):
     model = User
@@ -77,8 +94,7 @@ class AdminCreateView(SuperAdminRequiredMixin, CreateView):
 
     def form_valid(self, form):
         response = super().form_valid(form)
-        admin_group, _ = Group.objects.get_or_create(name='Admin')
-        self.object.groups.add(admin_group)
+        self.object.groups.add(role_group_id('Admin'))
         return response
 
 class AdminUpdateView(SuperAdminRequiredMixin, UpdateView):
@@ -94,29 +110,106 @@ class AdminDeleteView(SuperAdminRequiredMixin, DeleteView):
 
     def delete(self, request, *args, **kwargs):
         user = self.get_object()
-        if user.is_superuser or user.groups.filter(name='SuperAdmin').exists():
+        if user.is_superuser or has_role(user, 'SuperAdmin'):
             raise PermissionDenied("You cannot delete the superuser or a SuperAdmin.")
         return super().delete(request, *args, **kwargs)
 
 # Task Management (Admin and SuperAdmin)
-class TaskListAdminView(AdminRequiredMixin, ListView):
+class AdminTaskFilterMixin:
+    """Role scoping plus the status/username filters of the admin task panel."""
+    filter_params = ('status', 'user', 'q')
+
+    def get_filtered_tasks(self):
+        queryset = tasks_for(self.request.user)
+        status = self.request.GET.get('status')
+        if status:
+            queryset = queryset.filter(status=status)
+        username = self.request.GET.get('user')
+        if username:
+            queryset = queryset.filter(assigned_to__username__iexact=username.strip())
+        query = self.request.GET.get('q')
+        if query:
+            # Pages stay in due date order, so relevance ranking is skipped
+            queryset = search_tasks(queryset, query, ranked=False)
+        return queryset
+
+    def get_filter_query(self):
+        return urlencode({key: self.request.GET[key] for key in self.filter_params if self.request.GET.get(key)})
+
+class TaskListAdminView(AdminRequiredMixin, AdminTaskFilterMixin, CachedFragmentMixin, KeysetPaginationMixin, ListView):
     model = Task
     template_name = 'tasks_list_admin.html'
+    fragment_template_name = 'tasks_list_admin_table.html'
+    cache_params = AdminTaskFilterMixin.filter_params + ('after', 'before')
     context_object_name = 'tasks'
+    paginate_by = 50
+    paginate_key = 'due_date'
 
     def dispatch(self, request, *args, **kwargs):
         # If user is not Admin or SuperAdmin, redirect to user task list with message
-        if request.user.is_authenticated and request.user.groups.filter(name='User').exists():
+        if request.user.is_authenticated and has_role(request.user, 'User'):
             from django.contrib import messages
             messages.warning(request, "You do not have permission to access the admin task panel. Redirected to your tasks.")
             return redirect('tasks_list_user')
         return super().dispatch(request, *args, **kwargs)
 
     def get_queryset(self):
-        if self.request.user.groups.filter(name='SuperAdmin').exists():
-            return Task.objects.all()
-        # Admins see tasks of users they manage
-        return Task.objects.filter(assigned_to__userprofile__managed_by=self.request.user)
+        # The list shows neither descriptions nor reports
+        return self.get_filtered_tasks().select_related('assigned_to').defer('description', 'completion_report')
+
+    def get_context_data(self, **kwargs):
+        # Filters are carried over to the next/previous page and export links
+        return super().get_context_data(filter_query=self.get_filter_query(), **kwargs)
+
+class Echo:
+    # File-like object for csv.writer that hands each row back instead of storing it
+    def write(self, value):
+        return value
+
+class TaskExportView(AdminRequiredMixin, AdminTaskFilterMixin, View):
+    """
+    Stream the tasks visible in the admin panel as CSV or NDJSON.
+
+    Rows are read with a server-side chunked iterator and written out as
+    they arrive, so memory use does not grow with the size of the export.
+    """
+    export_fields = [
+        ('id', 'id'),
+        ('title', 'title'),
+        ('description', 'description'),
+        ('assigned_to', 'assigned_to__username'),
+        ('due_date', 'due_date'),
+        ('status', 'status'),
+        ('completion_report', 'completion_report'),
+        ('worked_hours', 'worked_hours'),
+    ]
+    chunk_size = 2000
+
+    def get_rows(self):
+        lookups = [lookup for _, lookup in self.export_fields]
+        return self.get_filtered_tasks().order_by('pk').values_list(*lookups).iterator(chunk_size=self.chunk_size)
+
+    def stream_csv(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow([name for name, _ in self.export_fields])
+        for row in rows:
+            yield writer.writerow(row)
+
+    def stream_ndjson(self, rows):
+        names = [name for name, _ in self.export_fields]
+        for row in rows:
+            yield json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + '\n'
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get('format', 'csv')
+        if export_format == 'ndjson':
+            response = StreamingHttpResponse(self.stream_ndjson(self.get_rows()), content_type='application/x-ndjson')
+        elif export_format == 'csv':
+            response = StreamingHttpResponse(self.stream_csv(self.get_rows()), content_type='text/csv')
+        else:
+            return HttpResponseBadRequest('Unsupported export format.')
+        response['Content-Disposition'] = f'attachment; filename="tasks.{export_format}"'
+        return response
 
 class TaskCreateView(AdminRequiredMixin, CreateView):
     model = Task
@@ -126,12 +219,12 @@ class TaskCreateView(AdminRequiredMixin, CreateView):
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
-        if not self.request.user.groups.filter(name='SuperAdmin').exists():
+        if not has_role(self.request.user, 'SuperAdmin'):
             # Limit assigned_to choices to users managed by this admin
-            kwargs['queryset'] = User.objects.filter(userprofile__managed_by=self.request.user)
+            kwargs['queryset'] = users_for(self.request.user)
         return kwargs
 
-class TaskUpdateView(AdminRequiredMixin, UpdateView):
+class TaskUpdateView(AdminRequiredMixin, VersionedUpdateMixin, UpdateView):
     model = Task
     form_class = TaskForm
     template_name = 'task_form.html'
@@ -139,8 +232,8 @@ class TaskUpdateView(AdminRequiredMixin, UpdateView):
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
-        if not self.request.user.groups.filter(name='SuperAdmin').exists():
-            kwargs['queryset'] = User.objects.filter(userprofile__managed_by=self.request.user)
+        if not has_role(self.request.user, 'SuperAdmin'):
+            kwargs['queryset'] = users_for(self.request.user)
         return kwargs
 
 class TaskDeleteView(AdminRequiredMixin, DeleteView):
@@ -159,46 +252,110 @@ class TaskReportDetailView(AdminRequiredMixin, DetailView):
             raise PermissionDenied("Report only available for completed tasks.")
         return task
 
+# User autocomplete for the user fields of the task and assignment forms
+class UserLookupView(AdminRequiredMixin, View):
+    """
+    JSON page of the users the caller may pick whose username starts with
+    ``q`` (or whose email does, when ``q`` has an ``@``), optionally limited
+    to one ``role``. Pass ``next`` back as ``after`` for the following page.
+    """
+    paginate_by = 20
+
+    def get(self, request, *args, **kwargs):
+        query = request.GET.get('q', '').strip()
+        users = search_users(users_for(request.user), query)
+        role = request.GET.get('role')
+        if role:
+            if role not in ROLE_NAMES:
+                return HttpResponseBadRequest('Unknown role.')
+            # Checked per candidate, so the username index drives the query
+            # and it stops after a page
+            Membership = User.groups.through
+            users = users.filter(Exists(Membership.objects.filter(user_id=OuterRef('pk'), group_id=role_group_id(role))))
+        paginator = KeysetPaginator(users.only('id', 'username', 'email'), 'search_key', self.paginate_by)
+        page = paginator.page(after=request.GET.get('after'))
+        return JsonResponse({
+            'results': [{'id': user.pk, 'username': user.username, 'email': user.email} for user in page],
+            'next': page.next_cursor,
+        })
+
 # Custom View: Assign Users to Admins (SuperAdmin Only)
 class AssignUserToAdminView(SuperAdminRequiredMixin, View):
     template_name = 'assign_user_form.html'
+    paginate_by = 50
+
+    def get_admin_filter(self):
+        try:
+            return int(self.request.GET.get('admin', ''))
+        except ValueError:
+            return None
 
     def get_assignments(self):
-        assignments = []
-        for user in User.objects.all():
-            try:
-                admins = user.userprofile.managed_by.all()
-                if admins:
-                    assignments.append({
-                        'user': user,
-                        'admins': admins
-                    })
-            except UserProfile.DoesNotExist:
-                continue
-        return assignments
+        # One query for the page of users (with their profiles) and one for
+        # all of their admins, whatever the page size
+        users = User.objects.filter(userprofile__managed_by__isnull=False)
+        admin_id = self.get_admin_filter()
+        if admin_id:
+            users = users.filter(userprofile__managed_by=admin_id)
+        users = users.distinct().order_by('username').select_related('userprofile')
+        page = Paginator(users, self.paginate_by).get_page(self.request.GET.get('page'))
+        prefetch_related_objects(
+            page.object_list,
+            Prefetch('userprofile__managed_by', queryset=User.objects.only('id', 'username').order_by('username')),
+        )
+        return page
+
+    def render_page(self, form):
+        page = self.get_assignments()
+        admin_id = self.get_admin_filter()
+        return render(self.request, self.template_name, {
+            'form': form,
+            'page_obj': page,
+            'assignments': [{'user': user, 'admins': user.userprofile.managed_by.all()} for user in page],
+            'admins': User.objects.filter(groups__name='Admin').only('id', 'username').order_by('username'),
+            'admin_filter': admin_id,
+            'filter_query': urlencode({'admin': admin_id}) if admin_id else '',
+        })
+
+    def get(self, request, *args, **kwargs):
+        return self.render_page(BulkAssignUserForm())
+
 
+# Custom View: Assign/Unassign many Users to an Admin at once (SuperAdmin Only)
+class BulkAssignUserView(AssignUserToAdminView):
     def get(self, request, *args, **kwargs):
-        form = AssignUserForm()
-        assignments = self.get_assignments()
-        return render(request, self.template_name, {'form': form, 'assignments': assignments})
+        return redirect('assign_user')
 
     def post(self, request, *args, **kwargs):
-        form = AssignUserForm(request.POST)
-        if form.is_valid():
-            user = form.cleaned_data['user']
-            admin = form.cleaned_data['admin']
-            user.userprofile.managed_by.add(admin)
-            assignments = self.get_assignments()
-            return render(request, self.template_name, {'form': AssignUserForm(), 'assignments': assignments})
-        assignments = self.get_assignments()
-        return render(request, self.template_name, {'form': form, 'assignments': assignments})
+        form = BulkAssignUserForm(request.POST)
+        if not form.is_valid():
+            return self.render_page(form)
+        users = form.cleaned_data['users']
+        admin = form.cleaned_data['admin']
+        profile_ids = dict(UserProfile.objects.filter(user__in=users).values_list('user_id', 'pk'))
+        missing = [UserProfile(user=user) for user in users if user.pk not in profile_ids]
+        if missing:
+            profile_ids.update((profile.user_id, profile.pk) for profile in UserProfile.objects.bulk_create(missing))
+        # A single INSERT/DELETE on the through table for the whole batch
+        if form.cleaned_data['action'] == 'assign':
+            admin.managed_users.add(*profile_ids.values())
+        else:
+            admin.managed_users.remove(*profile_ids.values())
+        query = self.get_return_query()
+        return redirect(reverse('assign_user') + ('?' + query if query else ''))
+
+    def get_return_query(self):
+        # Only the list's page and admin filter are carried back, never the
+        # raw submitted value
+        params = QueryDict(self.request.POST.get('next', ''))
+        return urlencode({key: params[key] for key in ('admin', 'page') if params.get(key, '').isdigit()})
+
 
 # Custom View: Promote/Demote Admins (SuperAdmin Only)
 class AdminPromoteDemoteView(SuperAdminRequiredMixin, View):
     def post(self, request, pk, action):
         user = get_object_or_404(User, pk=pk)
-        admin_group, _ = Group.objects.get_or_create(name='Admin')
-        user_group, _ = Group.objects.get_or_create(name='User')
+        admin_group, user_group = role_group_id('Admin'), role_group_id('User')
         if action == 'promote':
             user.groups.remove(user_group)
             user.groups.add(admin_group)
@@ -207,15 +364,3 @@ class AdminPromoteDemoteView(SuperAdminRequiredMixin, View):
             user.groups.add(user_group)
         return redirect('admin_list')
 
-
-# Custom View: Unassign Users from Admins (SuperAdmin Only)
-from .forms import UnassignUserForm
-
-class UnassignUserFromAdminView(SuperAdminRequiredMixin, View):
-    def post(self, request, *args, **kwargs):
-        form = UnassignUserForm(request.POST)
-        if form.is_valid():
-            user = form.cleaned_data['user']
-            admin = form.cleaned_data['admin']
-            user.userprofile.managed_by.remove(admin)
-        return redirect('assign_user')
\ No newline at end of file
@@ -5,12 +5,6 @@ class TasksConfig(AppConfig):
     name = 'tasks'
 
     def ready(self):
+        # No queries here: this runs in every worker and manage.py call. The
+        # role groups are created by migration 0010_default_groups.
         import tasks.signals
-        # Ensure default groups exist (safe to call multiple times)
-        try:
-            from django.contrib.auth.models import Group
-            for name in ['User', 'Admin', 'SuperAdmin']:
-                Group.objects.get_or_create(name=name)
-        except Exception:
-            # avoid crashing during migrations or when DB is not ready
-            pass
\ No newline at end of file
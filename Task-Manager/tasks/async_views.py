@@ -0,0 +1,161 @@
+"""
+Async versions of the task list, update and report API views.
+
+Under ASGI a sync view costs a thread hop per request and holds a thread for
+its whole duration; these run on the event loop and only leave it for the
+database queries themselves. DRF views cannot be async, so these are plain
+Django views that reuse the DRF serializers (which do no I/O here) and answer
+with the same status codes and error bodies as their DRF counterparts.
+"""
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+
+from . import events
+from .authentication import AsyncJWTAuthentication
+from .models import Task
+from .roles import ahas_role
+from .serializers import TaskReportSerializer, TaskUpdateSerializer, TaskValuesSerializer, requested_fields
+
+
+# Token-authenticated like the DRF API, so no CSRF cookie is involved
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAPIView(View):
+    authentication = AsyncJWTAuthentication()
+    # The caller needs at least one of these roles
+    required_roles = ()
+
+    async def authenticate(self, request):
+        auth = await self.authentication.aauthenticate(request)
+        if auth is None:
+            raise exceptions.NotAuthenticated()
+        request.user, request.auth = auth
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            await self.authenticate(request)
+            if not await ahas_role(request.user, *self.required_roles):
+                raise exceptions.PermissionDenied()
+            return await super().dispatch(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(request, exc)
+
+    def handle_exception(self, request, exc):
+        detail = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+        response = JsonResponse(detail, status=exc.status_code, safe=False)
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            response['WWW-Authenticate'] = self.authentication.authenticate_header(request)
+        return response
+
+    def parse_body(self, request):
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError as exc:
+            raise exceptions.ParseError(f'JSON parse error - {exc}')
+
+    async def get_task(self, queryset, pk):
+        try:
+            return await queryset.aget(pk=pk)
+        except Task.DoesNotExist:
+            raise exceptions.NotFound()
+
+
+class AsyncTaskListView(AsyncAPIView):
+    required_roles = ('User',)
+
+    async def get(self, request, *args, **kwargs):
+        tasks = await TaskValuesSerializer(Task.objects.filter(assigned_to=request.user), requested_fields(request.GET)).adata()
+        return JsonResponse(tasks, safe=False)
+
+
+class AsyncTaskUpdateView(AsyncAPIView):
+    required_roles = ('User',)
+
+    async def get(self, request, pk):
+        task = await self.get_task(Task.objects.filter(assigned_to=request.user), pk)
+        return JsonResponse(TaskUpdateSerializer(task).data)
+
+    async def put(self, request, pk, partial=False):
+        task = await self.get_task(Task.objects.filter(assigned_to=request.user), pk)
+        serializer = TaskUpdateSerializer(task, data=self.parse_body(request), partial=partial)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
+        task = await sync_to_async(serializer.save)()
+        return JsonResponse(TaskUpdateSerializer(task).data)
+
+    async def patch(self, request, pk):
+        return await self.put(request, pk, partial=True)
+
+
+class AsyncTaskReportView(AsyncAPIView):
+    required_roles = ('Admin', 'SuperAdmin')
+
+    async def get(self, request, pk):
+        task = await self.get_task(Task.objects.all(), pk)
+        if task.status != 'Completed':
+            raise exceptions.PermissionDenied('Report only available for completed tasks.')
+        return JsonResponse(TaskReportSerializer(task).data)
+
+
+class TaskEventsView(AsyncAPIView):
+    """
+    Server-Sent Events stream of task changes the caller may see.
+
+    Each event is ``{"type": "created"|"updated"|"deleted", "id", "assigned_to",
+    "status"}``. Browsers authenticate with their session cookie, other clients
+    with a JWT. An optional ``duration`` (seconds, at most ``max_duration``)
+    ends the stream sooner. Needs the ASGI server: a sync worker would be tied
+    up for the life of the connection.
+    """
+    required_roles = ('User', 'Admin', 'SuperAdmin')
+    # Comment lines keep proxies from closing idle connections
+    heartbeat_interval = 25
+    # Django 4.2 keeps iterating a stream after the client has gone, so each
+    # stream ends after a while and live browsers reconnect on their own
+    max_duration = 300
+
+    async def authenticate(self, request):
+        # EventSource cannot send headers, so fall back to the session
+        user = await sync_to_async(get_user)(request)
+        if user.is_authenticated:
+            request.user, request.auth = user, None
+        else:
+            await super().authenticate(request)
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({'detail': 'Live events need the ASGI server.'}, status=501)
+        try:
+            duration = min(float(request.GET.get('duration', self.max_duration)), self.max_duration)
+        except ValueError:
+            raise exceptions.ValidationError({'duration': ['A number of seconds is required.']})
+        channels = await events.channels_for(request.user)
+        response = StreamingHttpResponse(self.stream(channels, duration), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, channels, duration):
+        subscription = events.get_broker().subscribe(channels)
+        deadline = time.monotonic() + duration
+        try:
+            yield 'retry: 5000\n\n'
+            while time.monotonic() < deadline:
+                try:
+                    event = await subscription.get(min(self.heartbeat_interval, max(deadline - time.monotonic(), 0)))
+                except EOFError:
+                    return
+                if event is None:
+                    yield ': heartbeat\n\n'
+                else:
+                    yield f'event: task\ndata: {json.dumps(event)}\n\n'
+        finally:
+            subscription.close()
@@ -0,0 +1,124 @@
+from django.contrib.auth.models import User
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import UserProfile
+from .roles import get_roles
+from .tokens import MISSING, aget_token_version, forget_token_versions, get_token_version
+
+CLAIMS = ('username', 'roles', 'ver')
+
+
+class TaskTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Issues tokens that carry the user's name, roles and token version."""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        version = get_token_version(user.pk)
+        if version == MISSING:
+            UserProfile.objects.get_or_create(user=user)
+            forget_token_versions(user.pk)
+            version = get_token_version(user.pk)
+        token['username'] = user.username
+        token['roles'] = sorted(get_roles(user))
+        token['ver'] = version
+        return token
+
+
+class TaskTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refuses to refresh revoked tokens, whose roles may be out of date."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if 'ver' in refresh and get_token_version(refresh[api_settings.USER_ID_CLAIM]) != refresh['ver']:
+            raise InvalidToken(_('Token has been revoked'))
+        return super().validate(attrs)
+
+
+def issue_token(user):
+    """A refresh token for ``user`` as ``/api/token/`` would issue it."""
+    return TaskTokenObtainPairSerializer.get_token(user)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` that trusts the claims of tokens issued by
+    ``TaskTokenObtainPairSerializer`` instead of loading the user.
+
+    The only check is the user's token version, which is cached, so a
+    typical API call needs no authentication queries. ``request.user`` is an
+    unsaved ``User`` with just ``pk``, ``username`` and the roles filled in;
+    views must load the user before changing it. Older tokens without the
+    claims fall back to loading the user.
+    """
+
+    def get_user(self, validated_token):
+        if not all(claim in validated_token for claim in CLAIMS):
+            return super().get_user(validated_token)
+        self.check_version(validated_token, get_token_version(self.get_user_id(validated_token)))
+        return self.token_user(validated_token)
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+    def check_version(self, validated_token, version):
+        if version != validated_token['ver']:
+            raise AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+
+    def token_user(self, validated_token):
+        user = User(
+            **{api_settings.USER_ID_FIELD: self.get_user_id(validated_token)},
+            username=validated_token['username'],
+            is_active=True,
+        )
+        user._state.adding = False
+        user._role_cache = frozenset(validated_token['roles'])
+        return user
+
+
+class AsyncJWTAuthentication(ClaimsJWTAuthentication):
+    """
+    ``ClaimsJWTAuthentication`` for async views.
+
+    Header parsing and token validation need no I/O and are reused as is; the
+    version check and the fallback user lookup go through the async cache and
+    ORM. Raises the same exceptions as the sync class.
+    """
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        if all(claim in validated_token for claim in CLAIMS):
+            self.check_version(validated_token, await aget_token_version(user_id))
+            return self.token_user(validated_token)
+
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found') from e
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
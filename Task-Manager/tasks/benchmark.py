@@ -0,0 +1,402 @@
+"""
+Endpoint benchmarks with query-count and latency budgets.
+
+Every route in ``core.urls`` has at least one ``Case`` below describing who
+calls it and how. ``BenchmarkRunner`` replays each case against whatever is in
+the database (normally a ``seed_data`` dataset), recording latency percentiles
+and the number of SQL queries per request. All writes, including the
+fixtures the runner needs, are rolled back when the run ends.
+"""
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Callable, Optional
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.db import connection, reset_queries, transaction
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, get_resolver
+from rest_framework.renderers import JSONRenderer
+
+from core.replicas import pin_primary
+
+from .authentication import issue_token
+from .caching import CACHE_ALIAS, get_cache
+from .models import Task, UserProfile
+from .renderers import FastJSONRenderer
+from .serializers import TaskSerializer, TaskValuesSerializer
+
+BUDGETS_PATH = Path(settings.BASE_DIR) / 'benchmarks' / 'budgets.json'
+BENCH_PASSWORD = 'bench-password-123'
+
+# Routes that come from other apps' URLconfs and are not ours to budget
+SKIPPED_INCLUDES = ('accounts/', 'admin/')
+
+
+@dataclass
+class Case:
+    route: str
+    method: str = 'GET'
+    role: str = 'anon'
+    auth: str = 'session'
+    kwargs: Callable = lambda s: {}
+    data: Optional[Callable] = None
+    json: bool = False
+    # Served as an async stream, which needs the ASGI request path
+    stream: bool = False
+    # Sent with If-None-Match, as a polling client that is up to date would
+    revalidate: bool = False
+
+    @property
+    def label(self):
+        flags = (', jwt' if self.auth == 'jwt' else '') + (', revalidate' if self.revalidate else '')
+        return f'{self.method} /{self.route} [{self.role}{flags}]'
+
+
+CASES = [
+    Case(''),
+    Case('accounts/profile/', role='user'),
+    Case('my-tasks/', role='user'),
+    Case('my-tasks/<int:pk>/update/', role='user', kwargs=lambda s: {'pk': s.task.pk}),
+    Case('my-tasks/<int:pk>/update/', 'POST', role='user', kwargs=lambda s: {'pk': s.task.pk},
+         data=lambda s: {'status': 'In Progress', 'version': s.task.version}),
+    Case('tasks/<int:pk>/view/', role='user', kwargs=lambda s: {'pk': s.task.pk}),
+    Case('tasks/<int:pk>/view/', role='user', kwargs=lambda s: {'pk': s.task.pk}, revalidate=True),
+    Case('api/token/', 'POST', json=True,
+         data=lambda s: {'username': s.user.username, 'password': BENCH_PASSWORD}),
+    Case('api/token/refresh/', 'POST', json=True, data=lambda s: {'refresh': str(issue_token(s.user))}),
+    Case('tasks/', role='user', auth='jwt'),
+    Case('tasks/', role='user', auth='jwt', revalidate=True),
+    Case('tasks/bulk/', 'POST', role='admin', auth='jwt', json=True,
+         data=lambda s: [{'id': s.task.pk, 'status': 'In Progress'}]),
+    Case('tasks/search/', role='admin', auth='jwt', data=lambda s: {'q': 'report'}),
+    Case('tasks/changes/', role='user', auth='jwt'),
+    Case('tasks/dashboard/', role='admin', auth='jwt'),
+    Case('tasks/<int:pk>/', 'PATCH', role='user', auth='jwt', json=True, kwargs=lambda s: {'pk': s.task.pk},
+         data=lambda s: {'status': 'In Progress'}),
+    Case('tasks/<int:pk>/report/', role='admin', auth='jwt', kwargs=lambda s: {'pk': s.completed_task.pk}),
+    Case('tasks/<int:pk>/report/', role='admin', auth='jwt', kwargs=lambda s: {'pk': s.completed_task.pk},
+         revalidate=True),
+    Case('api/async/tasks/', role='user', auth='jwt'),
+    Case('api/async/tasks/<int:pk>/', 'PATCH', role='user', auth='jwt', json=True, kwargs=lambda s: {'pk': s.task.pk},
+         data=lambda s: {'status': 'In Progress'}),
+    Case('api/async/tasks/<int:pk>/report/', role='admin', auth='jwt', kwargs=lambda s: {'pk': s.completed_task.pk}),
+    Case('events/tasks/', role='admin', stream=True, data=lambda s: {'duration': 0}),
+    Case('admin/users/', role='superadmin'),
+    Case('admin/users/create/', role='superadmin'),
+    Case('admin/users/create/', 'POST', role='superadmin', data=lambda s: {
+        'username': 'bench_new_user', 'email': 'bench@example.com',
+        'password1': BENCH_PASSWORD, 'password2': BENCH_PASSWORD,
+    }),
+    Case('admin/users/<int:pk>/update/', role='superadmin', kwargs=lambda s: {'pk': s.spare_user.pk}),
+    Case('admin/users/<int:pk>/delete/', role='superadmin', kwargs=lambda s: {'pk': s.spare_user.pk}),
+    Case('admin/users/<int:pk>/delete/', 'POST', role='superadmin', kwargs=lambda s: {'pk': s.spare_user.pk}),
+    Case('admin/admins/', role='superadmin'),
+    Case('admin/admins/create/', role='superadmin'),
+    Case('admin/admins/<int:pk>/update/', role='superadmin', kwargs=lambda s: {'pk': s.admin.pk}),
+    Case('admin/admins/<int:pk>/delete/', role='superadmin', kwargs=lambda s: {'pk': s.admin.pk}),
+    Case('admin/admins/<int:pk>/<str:action>/', 'POST', role='superadmin',
+         kwargs=lambda s: {'pk': s.spare_user.pk, 'action': 'promote'}),
+    Case('admin/users/lookup/', role='admin', data=lambda s: {'q': s.user.username[:4]}),
+    Case('admin/users/lookup/', role='superadmin', data=lambda s: {'q': s.user.username[:4], 'role': 'User'}),
+    Case('admin/users/assign/', role='superadmin'),
+    Case('admin/users/assign/bulk/', 'POST', role='superadmin',
+         data=lambda s: {'users': [s.spare_user.pk], 'admin': s.admin.pk, 'action': 'assign'}),
+    Case('admin/tasks/', role='admin'),
+    Case('admin/tasks/', role='superadmin'),
+    Case('admin/tasks/create/', role='admin'),
+    Case('admin/tasks/export/', role='admin', data=lambda s: {'format': 'csv'}),
+    Case('admin/tasks/<int:pk>/update/', role='admin', kwargs=lambda s: {'pk': s.task.pk}),
+    Case('admin/tasks/<int:pk>/delete/', 'POST', role='admin', kwargs=lambda s: {'pk': s.task.pk}),
+    Case('admin/tasks/<int:pk>/report/', role='admin', kwargs=lambda s: {'pk': s.completed_task.pk}),
+    Case('accounts/login/'),
+    Case('accounts/login/', 'POST', data=lambda s: {'username': s.user.username, 'password': BENCH_PASSWORD}),
+    Case('accounts/logout/', 'POST', role='user'),
+]
+
+
+class Subjects:
+    """The users and tasks the cases act on, taken from the dataset or created for the run."""
+
+    def __init__(self):
+        groups = {name: Group.objects.get_or_create(name=name)[0] for name in ('User', 'Admin', 'SuperAdmin')}
+        self.superadmin = self.member_or_new(groups['SuperAdmin'], 'bench_superadmin')
+        self.admin = (
+            User.objects.filter(groups=groups['Admin'], managed_users__isnull=False).order_by('pk').first()
+            or self.member_or_new(groups['Admin'], 'bench_admin')
+        )
+        self.user = (
+            User.objects.filter(groups=groups['User'], userprofile__managed_by=self.admin,
+                                assigned_tasks__isnull=False).order_by('pk').first()
+            or self.member_or_new(groups['User'], 'bench_user')
+        )
+        UserProfile.objects.get_or_create(user=self.user)[0].managed_by.add(self.admin)
+        self.spare_user = self.new_user(groups['User'], 'bench_spare_user')
+        # Mutating cases move ``task`` to In Progress, so it must start elsewhere
+        # for every dataset to do the same work
+        self.task = (
+            Task.objects.filter(assigned_to=self.user, status='Pending').order_by('pk').first()
+            or self.new_task()
+        )
+        # ...and land in a dashboard rollup that already exists
+        if not Task.objects.filter(assigned_to=self.user, due_date=self.task.due_date, status='In Progress').exists():
+            self.new_task(status='In Progress', due_date=self.task.due_date)
+        self.completed_task = (
+            Task.objects.filter(assigned_to=self.user, status='Completed').order_by('pk').first()
+            or self.new_task(status='Completed', completion_report='Benchmark report', worked_hours=1)
+        )
+        for user in (self.superadmin, self.admin, self.user):
+            user.set_password(BENCH_PASSWORD)
+            user.save(update_fields=['password'])
+
+    def member_or_new(self, group, username):
+        return group.user_set.order_by('pk').first() or self.new_user(group, username)
+
+    def new_user(self, group, username):
+        user = User.objects.create_user(username, f'{username}@example.com', BENCH_PASSWORD)
+        user.groups.add(group)
+        return user
+
+    def new_task(self, **fields):
+        fields.setdefault('due_date', date(2025, 1, 1))
+        return Task.objects.create(title='Benchmark task', description='Benchmark task', assigned_to=self.user, **fields)
+
+    def for_role(self, role):
+        return getattr(self, role, None)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def check_coverage(cases=CASES):
+    """Return the routes of ``core.urls`` that have no benchmark case."""
+    covered = {case.route for case in cases}
+    missing = []
+    for pattern in get_resolver().url_patterns:
+        route = str(pattern.pattern)
+        if isinstance(pattern, URLPattern):
+            if route not in covered:
+                missing.append(route)
+        elif route not in SKIPPED_INCLUDES:
+            missing.append(route)
+    return missing
+
+
+class BenchmarkRunner:
+    def __init__(self, iterations=20, cases=CASES):
+        self.iterations = iterations
+        self.cases = cases
+
+    def run(self):
+        missing = check_coverage(self.cases)
+        if missing:
+            raise ValueError(f'No benchmark case for: {", ".join(missing)}')
+        results = {}
+        # The test clients' host, as allowed by Django's own test runner
+        allowed_hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        # Pages, roles and token versions built from the rolled-back fixtures
+        # must not reach the shared caches
+        caches = {
+            alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'benchmark-{alias}'}
+            for alias in ('default', CACHE_ALIAS)
+        }
+        # Fixtures live in an uncommitted transaction on the primary, so
+        # replicas can't serve this run
+        with override_settings(ALLOWED_HOSTS=allowed_hosts, CACHES=caches), pin_primary(), transaction.atomic():
+            subjects = Subjects()
+            try:
+                for case in self.cases:
+                    results[case.label] = self.run_case(case, subjects)
+            finally:
+                get_cache().clear()
+            transaction.set_rollback(True)
+        return results
+
+    def build_request(self, case, subjects):
+        client = AsyncClient() if case.stream else Client()
+        headers = {}
+        user = subjects.for_role(case.role)
+        if user is not None:
+            if case.auth == 'jwt':
+                headers['HTTP_AUTHORIZATION'] = f'Bearer {issue_token(user).access_token}'
+            else:
+                client.force_login(user)
+        kwargs = case.kwargs(subjects)
+        path = '/' + re.sub(r'<(?:\w+:)?(\w+)>', lambda match: str(kwargs[match.group(1)]), case.route)
+        data = case.data(subjects) if case.data else None
+        if case.json:
+            headers['content_type'] = 'application/json'
+            data = json.dumps(data)
+        return client, path, data, headers
+
+    def run_case(self, case, subjects):
+        timings, queries, statuses = [], 0, set()
+        # One warm-up request fills per-process caches the way a live worker
+        # would have. The first measured request then misses the response
+        # cache, so the query count is that of a cold page and the latency
+        # that of a warm one.
+        for iteration in range(self.iterations + 1):
+            if iteration == 1:
+                get_cache().clear()
+            client, path, data, headers = self.build_request(case, subjects)
+            request = getattr(client, case.method.lower())
+            if case.revalidate:
+                headers['HTTP_IF_NONE_MATCH'] = request(path, **headers)['ETag']
+            # The log is capped; a full one makes every capture look empty
+            reset_queries()
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    if case.stream:
+                        response = async_to_sync(self.fetch_stream)(request, path, data, headers)
+                    else:
+                        response = request(path, data, **headers) if data is not None else request(path, **headers)
+                        if response.streaming:
+                            b''.join(response.streaming_content)
+                    elapsed = time.perf_counter() - started
+                transaction.set_rollback(True)
+            if iteration:
+                timings.append(elapsed * 1000)
+                queries = max(queries, len(captured))
+                statuses.add(response.status_code)
+        return {
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'queries': queries,
+            'status': sorted(statuses),
+        }
+
+    @staticmethod
+    async def fetch_stream(request, path, data, headers):
+        response = await request(path, data, **headers)
+        if response.streaming:
+            [chunk async for chunk in response.streaming_content]
+        return response
+
+
+def database_profile():
+    """Describe the database setup the results were taken with."""
+    profile = {'engine': connection.settings_dict['ENGINE'], 'conn_max_age': connection.settings_dict['CONN_MAX_AGE']}
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size'):
+                cursor.execute(f'PRAGMA {pragma}')
+                profile[pragma] = cursor.fetchone()[0]
+    return profile
+
+
+# Run in a fresh interpreter, so nothing is imported or connected yet
+STARTUP_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import django
+from django.conf import settings
+settings.INSTALLED_APPS
+settings_done = time.perf_counter()
+django.setup()
+setup_done = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+urls_done = time.perf_counter()
+from django.db import connections
+print(json.dumps({
+    'settings_ms': (settings_done - started) * 1000,
+    'setup_ms': (setup_done - settings_done) * 1000,
+    'urls_ms': (urls_done - setup_done) * 1000,
+    'total_ms': (urls_done - started) * 1000,
+    'connections': sum(conn.connection is not None for conn in connections.all(initialized_only=True)),
+}))
+"""
+
+
+def measure_startup(runs=5):
+    """
+    Time a cold start the way a worker or ``manage.py`` does it: importing
+    ``core.settings``, ``django.setup()`` (app registry and ``ready()``
+    hooks) and importing the URL conf, each in a new process.
+
+    Returns the median of each step in milliseconds, plus the most database
+    connections any run opened before serving anything, which should be 0.
+    """
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'core.settings')}
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', STARTUP_SCRIPT], cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True, check=True,
+        ).stdout
+        samples.append(json.loads(output.splitlines()[-1]))
+    result = {
+        key: round(statistics.median(sample[key] for sample in samples), 2)
+        for key in ('settings_ms', 'setup_ms', 'urls_ms', 'total_ms')
+    }
+    result['connections'] = max(sample['connections'] for sample in samples)
+    return result
+
+
+def measure_serializers(rows=5000, runs=5):
+    """
+    Rows per second for turning ``rows`` tasks into a JSON body, with
+    ``TaskSerializer`` and ``JSONRenderer`` against ``TaskValuesSerializer``
+    and ``FastJSONRenderer``. Each path includes its query; best of ``runs``.
+    """
+    queryset = Task.objects.order_by('pk')[:rows]
+    paths = {
+        'TaskSerializer + JSONRenderer': lambda: JSONRenderer().render(TaskSerializer(queryset.all(), many=True).data),
+        'TaskValuesSerializer + FastJSONRenderer': lambda: FastJSONRenderer().render(TaskValuesSerializer(queryset.all()).data),
+    }
+    count = queryset.count()
+    results = {}
+    for name, serialize in paths.items():
+        best = min(timeit(serialize) for _ in range(runs))
+        results[name] = {'rows': count, 'ms': round(best * 1000, 2), 'rows_per_s': round(count / best) if best else 0}
+    return results
+
+
+def timeit(function):
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+def load_budgets(path=BUDGETS_PATH):
+    with open(path) as budgets:
+        return json.load(budgets)
+
+
+def compare(results, budgets, latency_tolerance=1.5, check_latency=True):
+    """Return a list of human-readable regressions of ``results`` against ``budgets``."""
+    regressions = []
+    for label, result in results.items():
+        if any(status >= 400 for status in result['status']):
+            regressions.append(f'{label}: unexpected status {result["status"]}')
+        budget = budgets.get(label)
+        if budget is None:
+            regressions.append(f'{label}: no budget')
+            continue
+        if result['queries'] > budget['queries']:
+            regressions.append(f'{label}: {result["queries"]} queries, budget {budget["queries"]}')
+        if check_latency and result['p95_ms'] > budget['p95_ms'] * latency_tolerance:
+            regressions.append(f'{label}: p95 {result["p95_ms"]}ms, budget {budget["p95_ms"]}ms')
+    return regressions
+
+
+def budgets_from(results, latency_headroom=2.0):
+    return {
+        label: {'queries': result['queries'], 'p95_ms': round(result['p95_ms'] * latency_headroom, 1)}
+        for label, result in results.items()
+    }
@@ -0,0 +1,126 @@
+"""
+Versioned cache for rendered task lists and API payloads.
+
+Entries are stored under the version of the scope they were built from, the
+same scopes as the live events: ``user:<id>`` for a user's own tasks,
+``team:<id>`` for the tasks of an admin's team and ``all`` for SuperAdmins.
+Task writes, team changes and user edits replace the versions of the scopes
+they touch when their transaction commits. A changed list is rebuilt on its
+next read, and its old entries are never read again and age out of the
+bounded cache.
+
+Everything lives in ``CACHES['tasks']``. Invalidation is exact for all
+processes sharing that cache, so several workers need the shared file cache
+(``DJANGO_CACHE_DIR``); a per-process local-memory cache only suits a single
+process.
+"""
+import hashlib
+import time
+
+from django.core.cache import caches
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.replicas import pin_primary
+
+from .events import ALL, channels_for_assignees, team_channel, user_channel
+from .roles import get_roles
+
+CACHE_ALIAS = 'tasks'
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def _version_key(scope):
+    return f'tasks:version:{scope}'
+
+
+def new_version():
+    # Unique rather than counted, so a version that was evicted is never
+    # started again at a value old entries were stored under
+    return time.time_ns()
+
+
+def get_version(scope):
+    cache = get_cache()
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        version = new_version()
+        # Another process may be starting the same scope; the first one wins
+        if not cache.add(key, version):
+            version = cache.get(key, version)
+    return version
+
+
+def expire(*scopes):
+    """Make every entry cached for ``scopes`` unreachable."""
+    if scopes:
+        get_cache().set_many({_version_key(scope): new_version() for scope in scopes})
+
+
+def expire_on_commit(*scopes):
+    if scopes:
+        transaction.on_commit(lambda: expire(*scopes))
+
+
+def expire_assignees_on_commit(user_ids):
+    """Expire every scope showing tasks of ``user_ids`` once the transaction commits."""
+    # Resolved now: a user being deleted has no team by commit time
+    channels = channels_for_assignees({user_id for user_id in user_ids if user_id is not None})
+    expire_on_commit(*set().union(*channels.values()))
+
+
+def viewer_scope(user):
+    """The scope of the tasks ``user`` sees through ``scoping.tasks_for``."""
+    roles = get_roles(user)
+    if 'SuperAdmin' in roles:
+        return ALL
+    if 'Admin' in roles:
+        return team_channel(user.pk)
+    return user_channel(user.pk)
+
+
+def cached(scope, key, build):
+    """
+    Return the value cached for ``key`` under the current version of
+    ``scope``, calling ``build`` to make it on a miss.
+    """
+    cache = get_cache()
+    digest = hashlib.sha256(repr((key, get_version(scope))).encode()).hexdigest()
+    cache_key = f'tasks:cached:{scope}:{digest}'
+    value = cache.get(cache_key)
+    if value is None:
+        # A replica may not have the writes behind the version just read yet
+        with pin_primary():
+            value = build()
+        cache.set(cache_key, value)
+    return value
+
+
+class CachedFragmentMixin:
+    """
+    View mixin that renders ``fragment_template_name`` with the context the
+    view would otherwise build and caches the HTML under the viewer's scope
+    and the ``cache_params`` of the query string. The page template outputs
+    it as ``{{ fragment }}``; on a hit none of the view's queries run.
+    """
+    fragment_template_name = None
+    cache_params = ()
+
+    def get_cache_scope(self):
+        return viewer_scope(self.request.user)
+
+    def get_cache_key(self):
+        return (self.fragment_template_name, [self.request.GET.get(param, '') for param in self.cache_params])
+
+    def get_context_data(self, **kwargs):
+        fragment = cached(
+            self.get_cache_scope(),
+            self.get_cache_key(),
+            lambda: render_to_string(self.fragment_template_name, super(CachedFragmentMixin, self).get_context_data(**kwargs), self.request),
+        )
+        return {**kwargs, 'view': self, 'fragment': mark_safe(fragment)}
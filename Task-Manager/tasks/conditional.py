@@ -0,0 +1,93 @@
+from django.http import HttpResponseRedirect
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The task has changed since you read it.'
+    default_code = 'precondition_failed'
+
+
+class VersionConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The task was changed by someone else. Reload it and try again.'
+    default_code = 'conflict'
+
+
+def task_etag(task):
+    """A strong validator for ``task``, from the version every write bumps."""
+    return f'task-{task.pk}-v{task.version}'
+
+
+def check_preconditions(request, etag=None, last_modified=None):
+    """
+    Evaluate the request's conditional headers against the current
+    validators. Returns a 304 (or 412) response when the request should not
+    go ahead and ``None`` when it should.
+    """
+    return get_conditional_response(
+        request,
+        etag=quote_etag(etag) if etag else None,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+
+
+class ConditionalGetMixin:
+    """
+    View mixin answering ``If-None-Match`` and ``If-Modified-Since``.
+
+    ``get_etag()`` and ``get_last_modified()`` must be much cheaper than
+    building the response: a client that is up to date gets a 304 before
+    anything is queried for the body or serialized. Every successful GET
+    carries the validators. When there is an ETag it alone decides the 304:
+    ``Last-Modified`` only has whole seconds, so a second change within the
+    same second would otherwise be answered as not modified. Works with Django and DRF views; DRF sends
+    ``Vary: Accept``, so the JSON and browsable API bodies can share them.
+    """
+
+    def get_etag(self):
+        return None
+
+    def get_last_modified(self):
+        return None
+
+    def get_object(self, *args, **kwargs):
+        # Needed by the validators and by the view itself; load it once
+        if not hasattr(self, '_conditional_object'):
+            self._conditional_object = super().get_object(*args, **kwargs)
+        return self._conditional_object
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_etag(), self.get_last_modified()
+        response = check_preconditions(request, etag, None if etag else last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            if etag:
+                response.headers['ETag'] = quote_etag(etag)
+            if last_modified:
+                response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
+
+
+class VersionedUpdateMixin:
+    """
+    ``UpdateView`` mixin for task forms carrying the ``version`` they were
+    rendered with. Saves the form's fields with ``Task.save_if_current()``;
+    if the task has been written since, the form comes back with an error
+    and status 409 instead of overwriting that change.
+    """
+    conflict_message = 'This task was changed by someone else while you were editing it. Reload it to see their changes.'
+
+    def form_valid(self, form):
+        task = form.instance
+        task.apply_completion_rules()
+        if task.save_if_current([name for name in form.fields if name != 'version']):
+            return HttpResponseRedirect(self.get_success_url())
+        form.add_error(None, self.conflict_message)
+        response = self.form_invalid(form)
+        response.status_code = status.HTTP_409_CONFLICT
+        return response
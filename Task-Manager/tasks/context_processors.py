@@ -0,0 +1,11 @@
+from django.conf import settings
+
+from .roles import get_roles
+
+
+def roles(request):
+    return {'user_roles': get_roles(getattr(request, 'user', None))}
+
+
+def task_events(request):
+    return {'task_events_live': settings.TASK_EVENTS_LIVE}
@@ -0,0 +1,166 @@
+"""
+Live task events for the Server-Sent Events endpoint.
+
+Task writes publish small events to channels: ``user:<id>`` for the
+assignee, ``team:<id>`` for each admin managing the assignee and ``all`` for
+SuperAdmins, mirroring ``scoping.tasks_for``. Subscribers are asyncio
+queues, so an idle connection costs one queue and no thread.
+
+The broker class is set with ``TASK_EVENTS_BROKER``. The default
+``InProcessBroker`` needs no outside service but only reaches subscribers in
+the process that made the write; with several server processes, plug in a
+broker that shares events between them.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .models import AdminVisibility
+from .roles import aget_roles
+
+ALL = 'all'
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def team_channel(admin_id):
+    return f'team:{admin_id}'
+
+
+class Subscription:
+    def __init__(self, broker, channels, queue, loop):
+        self.broker = broker
+        self.channels = channels
+        self.queue = queue
+        self.loop = loop
+        self.closed = False
+
+    async def get(self, timeout=None):
+        """
+        Wait for the next event, or return ``None`` after ``timeout`` seconds.
+
+        Raises ``EOFError`` once the broker has dropped the subscription.
+        """
+        if self.closed:
+            raise EOFError
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Fan events out to subscribers in this process."""
+
+    # Events a slow client may fall behind by before it is dropped; browsers
+    # reconnect on their own and reload the current state
+    max_queue_size = 100
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)
+
+    def subscribe(self, channels):
+        subscription = Subscription(
+            self, channels, asyncio.Queue(self.max_queue_size), asyncio.get_running_loop(),
+        )
+        with self.lock:
+            for channel in channels:
+                self.subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                self.subscribers[channel].discard(subscription)
+                if not self.subscribers[channel]:
+                    del self.subscribers[channel]
+
+    def active(self):
+        """False when nobody can be listening, so publishers may skip the work."""
+        return bool(self.subscribers)
+
+    def publish(self, channels, event):
+        """Deliver ``event`` once to every subscriber of any of ``channels``. Safe from any thread."""
+        with self.lock:
+            targets = set().union(*(self.subscribers.get(channel, ()) for channel in channels))
+        for subscription in targets:
+            subscription.loop.call_soon_threadsafe(self.deliver, subscription, event)
+
+    def deliver(self, subscription, event):
+        try:
+            subscription.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            subscription.closed = True
+            self.unsubscribe(subscription)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'TASK_EVENTS_BROKER', 'tasks.events.InProcessBroker'))()
+    return _broker
+
+
+async def channels_for(user):
+    """The channels carrying the events for the tasks ``user`` may see."""
+    roles = await aget_roles(user)
+    if 'SuperAdmin' in roles:
+        return {ALL}
+    if 'Admin' in roles:
+        return {team_channel(user.pk)}
+    return {user_channel(user.pk)}
+
+
+def channels_for_assignees(user_ids):
+    """Map each assignee id to the channels its task events go to."""
+    channels = {user_id: {ALL, user_channel(user_id)} for user_id in user_ids if user_id is not None}
+    managers = AdminVisibility.objects.filter(user_id__in=channels)
+    for user_id, admin_id in managers.values_list('user_id', 'admin_id'):
+        channels[user_id].add(team_channel(admin_id))
+    return channels
+
+
+def task_event(kind, task):
+    return {
+        'type': kind,
+        'id': task.pk,
+        'assigned_to': task.assigned_to_id,
+        'status': task.status,
+    }
+
+
+def publish_on_commit(changes):
+    """
+    Publish ``(kind, task, previous_assignee_id)`` changes once the current
+    transaction commits.
+
+    A reassigned task is also announced to its previous assignee's channels,
+    where it disappears.
+    """
+    broker = get_broker()
+    if not changes or not broker.active():
+        return
+    events = [(task_event(kind, task), {task.assigned_to_id, previous}) for kind, task, previous in changes]
+
+    def publish():
+        channels = channels_for_assignees(set().union(*(assignees for _, assignees in events)))
+        for event, assignees in events:
+            broker.publish(set().union(*(channels.get(user_id, ()) for user_id in assignees)), event)
+
+    transaction.on_commit(publish)
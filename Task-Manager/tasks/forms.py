@@ -1,21 +1,62 @@
+import copy
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User, Group
 from .models import Task, UserProfile
 from django.contrib.auth.forms import ReadOnlyPasswordHashField
+from django.urls import reverse
+from django.utils.http import urlencode
+
+
+class UserLookupSelect(forms.Select):
+    """
+    Select for a user field that renders only the selected users instead of
+    every user in the field's queryset. ``user_lookup.html`` adds a search box
+    that fills in the rest from the ``user_lookup`` endpoint; submitted values
+    are still checked against the queryset by the field.
+    """
+
+    def __init__(self, attrs=None, role=None):
+        super().__init__(attrs)
+        self.role = role
+
+    def get_context(self, name, value, attrs):
+        url = reverse('user_lookup') + ('?' + urlencode({'role': self.role}) if self.role else '')
+        return super().get_context(name, value, {**(attrs or {}), 'data-lookup-url': url})
+
+    def optgroups(self, name, value, attrs=None):
+        field = self.choices.field
+        choices = [('', field.empty_label)] if field.empty_label is not None else []
+        pks = [pk for pk in value if pk.isdigit()]
+        if pks:
+            choices += [(user.pk, field.label_from_instance(user)) for user in field.queryset.filter(pk__in=pks)]
+        widget = copy.copy(self)
+        widget.choices = choices
+        return super(UserLookupSelect, widget).optgroups(name, value, attrs)
+
+
+class UserLookupSelectMultiple(UserLookupSelect, forms.SelectMultiple):
+    pass
+
 
 class TaskForm(forms.ModelForm):
     class Meta:
         model = Task
-        fields = ['title', 'description', 'assigned_to', 'due_date', 'status', 'completion_report', 'worked_hours']
+        fields = ['title', 'description', 'assigned_to', 'due_date', 'status', 'completion_report', 'worked_hours', 'version']
         widgets = {
+            'assigned_to': UserLookupSelect(),
+            'version': forms.HiddenInput(),
             'due_date': forms.DateInput(attrs={'type': 'date'}),
             'completion_report': forms.Textarea(attrs={'rows': 4}),
         }
 
     def __init__(self, *args, queryset=None, **kwargs):
         super().__init__(*args, **kwargs)
-        if queryset:
+        if self.instance._state.adding:
+            # Only edits are checked against the version they started from
+            del self.fields['version']
+        if queryset is not None:
             self.fields['assigned_to'].queryset = queryset
 
     def clean(self):
@@ -67,12 +108,18 @@ class AdminForm(UserCreationForm):
         model = User
         fields = ['username', 'email', 'password1', 'password2']
 
-class AssignUserForm(forms.Form):
-    user = forms.ModelChoiceField(queryset=User.objects.filter(groups__name='User'))
-    admin = forms.ModelChoiceField(queryset=User.objects.filter(groups__name='Admin'))
-
+class BulkAssignUserForm(forms.Form):
+    ACTION_CHOICES = [
+        ('assign', 'Assign'),
+        ('unassign', 'Unassign'),
+    ]
 
-# Form for unassigning a user from an admin
-class UnassignUserForm(forms.Form):
-    user = forms.ModelChoiceField(queryset=User.objects.filter(groups__name='User'))
-    admin = forms.ModelChoiceField(queryset=User.objects.filter(groups__name='Admin'))
\ No newline at end of file
+    users = forms.ModelMultipleChoiceField(
+        queryset=User.objects.filter(groups__name='User'),
+        widget=UserLookupSelectMultiple(attrs={'size': 8}, role='User'),
+    )
+    admin = forms.ModelChoiceField(
+        queryset=User.objects.filter(groups__name='Admin'),
+        widget=UserLookupSelect(role='Admin'),
+    )
+    action = forms.ChoiceField(choices=ACTION_CHOICES, initial='assign')
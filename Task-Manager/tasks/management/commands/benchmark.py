@@ -0,0 +1,81 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from tasks import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Time every endpoint and count its SQL queries, then compare against the checked-in budgets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--budgets', type=Path, default=benchmark.BUDGETS_PATH)
+        parser.add_argument('--output', type=Path, help='Write the results as JSON to this file')
+        parser.add_argument('--label', default='', help='Free-form tag stored with the results, e.g. a commit hash')
+        parser.add_argument('--no-latency', action='store_true',
+                            help='Only enforce query budgets; latency depends on the machine')
+        parser.add_argument('--update-budgets', action='store_true',
+                            help='Overwrite the budget file with this run instead of comparing')
+        parser.add_argument('--startup', action='store_true',
+                            help='Time --iterations cold starts (settings, app setup, URL conf) instead')
+        parser.add_argument('--serializers', type=int, metavar='ROWS',
+                            help='Compare task list serializers on this many rows instead')
+
+    def handle(self, *args, **options):
+        if options['startup']:
+            return self.handle_startup(options['iterations'])
+        if options['serializers']:
+            return self.handle_serializers(options['serializers'])
+        try:
+            results = benchmark.BenchmarkRunner(options['iterations']).run()
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        for label, result in results.items():
+            self.stdout.write(
+                f"{label:<60} {result['queries']:>4}q  p50 {result['p50_ms']:>8.2f}ms  "
+                f"p95 {result['p95_ms']:>8.2f}ms  p99 {result['p99_ms']:>8.2f}ms"
+            )
+
+        if options['output']:
+            options['output'].parent.mkdir(parents=True, exist_ok=True)
+            options['output'].write_text(json.dumps({
+                'label': options['label'],
+                'timestamp': timezone.now().isoformat(),
+                'iterations': options['iterations'],
+                'database': benchmark.database_profile(),
+                'results': results,
+            }, indent=2))
+
+        if options['update_budgets']:
+            options['budgets'].parent.mkdir(parents=True, exist_ok=True)
+            options['budgets'].write_text(json.dumps(benchmark.budgets_from(results), indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Wrote budgets for {len(results)} endpoints"))
+            return
+
+        regressions = benchmark.compare(
+            results, benchmark.load_budgets(options['budgets']), check_latency=not options['no_latency'],
+        )
+        if regressions:
+            raise CommandError('Endpoint budgets exceeded:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS(f'All {len(results)} endpoints within budget'))
+
+    def handle_startup(self, runs):
+        startup = benchmark.measure_startup(runs)
+        self.stdout.write(
+            f"Startup over {runs} runs (median): settings {startup['settings_ms']:.2f}ms  "
+            f"app setup {startup['setup_ms']:.2f}ms  URL conf {startup['urls_ms']:.2f}ms  "
+            f"total {startup['total_ms']:.2f}ms"
+        )
+        if startup['connections']:
+            raise CommandError(f"Startup opened {startup['connections']} database connection(s)")
+        self.stdout.write(self.style.SUCCESS('No database connections during startup'))
+
+    def handle_serializers(self, rows):
+        for name, result in benchmark.measure_serializers(rows).items():
+            self.stdout.write(
+                f"{name:<45} {result['rows']:>7} rows  {result['ms']:>9.2f}ms  {result['rows_per_s']:>9} rows/s"
+            )
@@ -1,11 +1,13 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import Group
 
+from tasks.roles import ROLE_NAMES
+
 class Command(BaseCommand):
     help = 'Create default groups: User, Admin, SuperAdmin'
 
     def handle(self, *args, **options):
-        for name in ['User', 'Admin', 'SuperAdmin']:
+        for name in ROLE_NAMES:
             group, created = Group.objects.get_or_create(name=name)
             if created:
                 self.stdout.write(self.style.SUCCESS(f'Created group: {name}'))
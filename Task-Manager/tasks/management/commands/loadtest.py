@@ -0,0 +1,67 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+from threading import local
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.benchmark import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Fire concurrent requests at a running server and report throughput and latency, '
+        'e.g. to compare /tasks/ under WSGI with /api/async/tasks/ under ASGI'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Paths to request, e.g. /tasks/ /api/async/tasks/')
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the running server')
+        parser.add_argument('--username', required=True, help='Account used to obtain a JWT')
+        parser.add_argument('--password', default='password')
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per path')
+        parser.add_argument('--method', default='GET')
+        parser.add_argument('--data', help='JSON request body, e.g. for PATCH')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        connections = local()
+
+        def request(method, path, body=None, headers=None):
+            # One keep-alive connection per client thread
+            if not hasattr(connections, 'conn'):
+                connections.conn = HTTPConnection(url.hostname, url.port or 80, timeout=60)
+            started = time.perf_counter()
+            connections.conn.request(method, path, body=body, headers=headers or {})
+            response = connections.conn.getresponse()
+            content = response.read()
+            return response.status, content, (time.perf_counter() - started) * 1000
+
+        status, content, _ = request(
+            'POST', '/api/token/',
+            json.dumps({'username': options['username'], 'password': options['password']}),
+            {'Content-Type': 'application/json'},
+        )
+        if status != 200:
+            raise CommandError(f'Could not obtain a token: {status} {content[:200]!r}')
+        headers = {'Authorization': f"Bearer {json.loads(content)['access']}"}
+        if options['data']:
+            headers['Content-Type'] = 'application/json'
+        method, body = options['method'].upper(), options['data']
+
+        for path in options['paths']:
+            with ThreadPoolExecutor(options['concurrency']) as pool:
+                # Warm up every worker's connection and caches first
+                list(pool.map(lambda _: request(method, path, body, headers), range(options['concurrency'])))
+                started = time.perf_counter()
+                results = list(pool.map(lambda _: request(method, path, body, headers), range(options['requests'])))
+                elapsed = time.perf_counter() - started
+            timings = [timing for _, _, timing in results]
+            errors = sum(1 for status, _, _ in results if status >= 400)
+            self.stdout.write(
+                f'{path:<30} {len(results) / elapsed:>8.1f} req/s  p50 {percentile(timings, 50):>8.2f}ms  '
+                f'p95 {percentile(timings, 95):>8.2f}ms  p99 {percentile(timings, 99):>8.2f}ms  errors {errors}'
+            )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from tasks.models import TaskTombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete deleted-task markers older than TOMBSTONE_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        count, _ = TaskTombstone.objects.filter(deleted_at__lt=TaskTombstone.retention_cutoff()).delete()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {count} tombstones'))
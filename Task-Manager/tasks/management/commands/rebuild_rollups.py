@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from tasks import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the dashboard task rollups from the task table'
+
+    def handle(self, *args, **options):
+        count = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} rollup rows'))
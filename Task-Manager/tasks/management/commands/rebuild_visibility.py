@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks import visibility
+
+
+class Command(BaseCommand):
+    help = 'Check the admin visibility index against UserProfile.managed_by and rebuild it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only report differences; exit with an error if there are any')
+
+    def handle(self, *args, **options):
+        missing, extra = visibility.diff()
+        if missing or extra:
+            self.stdout.write(self.style.WARNING(f'Index differs: {len(missing)} rows missing, {len(extra)} extra'))
+        else:
+            self.stdout.write('Index matches managed_by')
+        if options['check']:
+            if missing or extra:
+                raise CommandError('The admin visibility index is out of date; run rebuild_visibility.')
+            return
+        count = visibility.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} visibility rows'))
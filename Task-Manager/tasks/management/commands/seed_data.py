@@ -0,0 +1,149 @@
+import random
+import time
+from datetime import date, timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from tasks import rollups, search, visibility
+from tasks.models import Task, UserProfile
+
+WORDS = [
+    'report', 'invoice', 'client', 'server', 'deploy', 'review', 'audit', 'budget', 'meeting', 'design',
+    'backup', 'migration', 'schedule', 'inventory', 'payroll', 'onboarding', 'training', 'support', 'ticket',
+    'dashboard', 'release', 'contract', 'survey', 'security', 'network', 'printer', 'website', 'newsletter',
+]
+VERBS = ['Prepare', 'Update', 'Fix', 'Check', 'Plan', 'Send', 'Clean up', 'Document', 'Test', 'Organise']
+STATUS_WEIGHTS = [('Pending', 35), ('In Progress', 25), ('Completed', 40)]
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic dataset of users, admins, assignments and tasks for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--admins', type=int, default=20)
+        parser.add_argument('--tasks', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--prefix', default='load', help='Username prefix for generated accounts')
+        parser.add_argument('--password', default='password', help='Password set on every generated account')
+        parser.add_argument('--anchor-date', type=date.fromisoformat, default=date(2025, 10, 1),
+                            help='Due dates are spread around this date (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f'Users with prefix "{prefix}_" already exist; pick another --prefix.')
+        if options['users'] < 1 and options['tasks']:
+            raise CommandError('Tasks need at least one user to be assigned to.')
+
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        started = time.monotonic()
+
+        with transaction.atomic():
+            admin_ids = self.create_users(f'{prefix}_admin', options['admins'], 'Admin', options['password'], batch_size)
+            user_ids = self.create_users(f'{prefix}_user', options['users'], 'User', options['password'], batch_size)
+            links = self.assign_admins(rng, user_ids, admin_ids, batch_size)
+            # The links are bulk inserted past the signals that index them
+            visibility.rebuild()
+            # Loading is much faster without the per-row FTS triggers; the
+            # index is rebuilt in one pass afterwards
+            search.uninstall(connection)
+            self.create_tasks(rng, user_ids, options['tasks'], options['anchor_date'], batch_size)
+            search.install(connection)
+            rollups.rebuild()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(admin_ids)} admins, {len(user_ids)} users, {links} assignments and "
+            f"{options['tasks']} tasks in {time.monotonic() - started:.1f}s"
+        ))
+
+    def create_users(self, prefix, count, role, password, batch_size):
+        password = make_password(password)
+        users = User.objects.bulk_create(
+            [User(username=f'{prefix}_{n:07d}', email=f'{prefix}_{n:07d}@example.com', password=password)
+             for n in range(count)],
+            batch_size=batch_size,
+        )
+        user_ids = [user.pk for user in users]
+        # bulk_create skips the post_save handler that normally adds profiles
+        UserProfile.objects.bulk_create([UserProfile(user_id=pk) for pk in user_ids], batch_size=batch_size)
+        group, _ = Group.objects.get_or_create(name=role)
+        Membership = User.groups.through
+        Membership.objects.bulk_create([Membership(user_id=pk, group_id=group.pk) for pk in user_ids], batch_size=batch_size)
+        return user_ids
+
+    def assign_admins(self, rng, user_ids, admin_ids, batch_size):
+        if not admin_ids:
+            return 0
+        profile_ids = dict(UserProfile.objects.filter(user_id__in=user_ids).values_list('user_id', 'pk'))
+        Link = UserProfile.managed_by.through
+        links = []
+        for user_id in user_ids:
+            # Most users have one admin, some two, a few none
+            managers = rng.choices([0, 1, 2], weights=[5, 80, 15])[0]
+            for admin_id in rng.sample(admin_ids, min(managers, len(admin_ids))):
+                links.append(Link(userprofile_id=profile_ids[user_id], user_id=admin_id))
+        Link.objects.bulk_create(links, batch_size=batch_size)
+        return len(links)
+
+    def create_tasks(self, rng, user_ids, count, anchor, batch_size):
+        # bulk_create's per-value field preparation dominates at this volume,
+        # so rows are built as plain tuples and sent with executemany()
+        fields = [field for field in Task._meta.concrete_fields if not field.primary_key]
+        quote = connection.ops.quote_name
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote(Task._meta.db_table),
+            ', '.join(quote(field.column) for field in fields),
+            ', '.join(['%s'] * len(fields)),
+        )
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        defaults = {field.attname: field.get_db_prep_save(field.get_default(), connection) for field in fields}
+        defaults.update(created_at=now, updated_at=now, completion_report=None, worked_hours=None)
+        due_dates = {offset: connection.ops.adapt_datefield_value(anchor + timedelta(days=offset)) for offset in range(-120, 61)}
+
+        # Free text comes from a fixed pool; generating it per row costs more
+        # than inserting it
+        descriptions = [' '.join(rng.choices(WORDS, k=rng.randint(8, 40))) for _ in range(4096)]
+        reports = [' '.join(rng.choices(WORDS, k=rng.randint(5, 25))) for _ in range(4096)]
+
+        # A long tail: a few users carry many more tasks than the rest
+        cum_weights = list(accumulate(1 / (rank + 1) ** 0.6 for rank in range(len(user_ids))))
+        statuses = [status for status, _ in STATUS_WEIGHTS]
+        status_weights = [weight for _, weight in STATUS_WEIGHTS]
+        created = 0
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                # Index pages for 1M rows don't fit SQLite's default 2MB cache
+                cursor.execute('PRAGMA cache_size = -262144')
+            while created < count:
+                size = min(batch_size, count - created)
+                assignees = rng.choices(user_ids, cum_weights=cum_weights, k=size)
+                batch = []
+                for assignee, status in zip(assignees, rng.choices(statuses, weights=status_weights, k=size)):
+                    # Completed work is mostly in the past, open work mostly ahead
+                    offset = int(rng.triangular(-120, 60, -30 if status == 'Completed' else 20))
+                    word = rng.choice(WORDS)
+                    row = dict(
+                        defaults,
+                        title=f'{rng.choice(VERBS)} {word} {rng.choice(WORDS)}',
+                        description=rng.choice(descriptions),
+                        assigned_to_id=assignee,
+                        due_date=due_dates[offset],
+                        status=status,
+                    )
+                    if status == 'Completed':
+                        row['completion_report'] = f'Finished the {word} work. {rng.choice(reports)}'
+                        row['worked_hours'] = max(1, int(rng.triangular(1, 16, 3)))
+                    batch.append(tuple(row[field.attname] for field in fields))
+                cursor.executemany(sql, batch)
+                created += size
+                self.stdout.write(f'  {created}/{count} tasks', ending='\r')
+        if count:
+            self.stdout.write('')
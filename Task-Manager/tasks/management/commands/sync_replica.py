@@ -0,0 +1,41 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database into the SQLite replica files, once or every --interval seconds'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, help='Keep copying, this many seconds apart')
+
+    def handle(self, *args, **options):
+        primary = connections['default'].settings_dict
+        targets = [connections[alias].settings_dict for alias in settings.DATABASE_REPLICAS]
+        if primary['ENGINE'].rsplit('.', 1)[-1] != 'sqlite3' or not targets:
+            raise CommandError('Needs a SQLite primary and at least one replica in DJANGO_DB_REPLICAS.')
+        for target in targets:
+            if target['ENGINE'] != primary['ENGINE']:
+                raise CommandError(f"Replica {target['NAME']} is not SQLite; replicate it with its own tooling.")
+
+        while True:
+            started = time.monotonic()
+            # The backup API takes a consistent snapshot while the primary is
+            # in use
+            source = sqlite3.connect(primary['NAME'])
+            try:
+                for target in targets:
+                    destination = sqlite3.connect(target['NAME'])
+                    try:
+                        source.backup(destination)
+                    finally:
+                        destination.close()
+            finally:
+                source.close()
+            self.stdout.write(f'Copied to {len(targets)} replica(s) in {time.monotonic() - started:.2f}s')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.24 on 2026-10-18 04:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_rollups(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    TaskRollup = apps.get_model('tasks', 'TaskRollup')
+    rows = (
+        Task.objects.order_by()
+        .values('assigned_to_id', 'status', 'due_date')
+        .annotate(task_count=models.Count('id'), worked_hours=models.Sum('worked_hours'))
+    )
+    TaskRollup.objects.bulk_create([
+        TaskRollup(
+            user_id=row['assigned_to_id'],
+            status=row['status'],
+            day=row['due_date'],
+            task_count=row['task_count'],
+            worked_hours=row['worked_hours'] or 0,
+        )
+        for row in rows.iterator()
+    ], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tasks', '0006_task_timestamps_tombstones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('In Progress', 'In Progress'), ('Completed', 'Completed')], max_length=20)),
+                ('day', models.DateField()),
+                ('task_count', models.IntegerField(default=0)),
+                ('worked_hours', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='taskrollup',
+            constraint=models.UniqueConstraint(fields=('user', 'status', 'day'), name='rollup_user_status_day_uniq'),
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from tasks import search
+
+
+def install_search(apps, schema_editor):
+    search.install(schema_editor.connection)
+
+
+def uninstall_search(apps, schema_editor):
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_task_rollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, uninstall_search),
+    ]
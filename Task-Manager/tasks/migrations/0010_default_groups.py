@@ -0,0 +1,22 @@
+from django.db import migrations
+
+ROLE_NAMES = ('User', 'Admin', 'SuperAdmin')
+
+
+def create_groups(apps, schema_editor):
+    Group = apps.get_model('auth', 'Group')
+    for name in ROLE_NAMES:
+        Group.objects.using(schema_editor.connection.alias).get_or_create(name=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('tasks', '0009_userprofile_token_version'),
+    ]
+
+    operations = [
+        # Groups may already hold users, so they are kept on reverse
+        migrations.RunPython(create_groups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.24 on 2026-10-18 05:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_visibility(apps, schema_editor):
+    UserProfile = apps.get_model('tasks', 'UserProfile')
+    AdminVisibility = apps.get_model('tasks', 'AdminVisibility')
+    links = UserProfile.managed_by.through.objects.values_list('user_id', 'userprofile__user_id')
+    AdminVisibility.objects.bulk_create(
+        [AdminVisibility(admin_id=admin_id, user_id=user_id) for admin_id, user_id in links.iterator()],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tasks', '0010_default_groups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdminVisibility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('admin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visible_users', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visible_to', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='adminvisibility',
+            constraint=models.UniqueConstraint(fields=('admin', 'user'), name='visibility_admin_user_uniq'),
+        ),
+        migrations.RunPython(build_visibility, migrations.RunPython.noop),
+    ]
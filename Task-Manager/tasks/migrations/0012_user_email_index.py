@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Index auth_user.email for the prefix lookups of the user autocomplete."""
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('tasks', '0011_admin_visibility'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS tasks_user_email_idx ON auth_user (email)',
+            'DROP INDEX IF EXISTS tasks_user_email_idx',
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Index lower(username) and lower(email) for the case-insensitive prefix
+    lookups of the user autocomplete, replacing the plain email index.
+    """
+
+    dependencies = [
+        ('tasks', '0013_task_version'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [
+                'CREATE INDEX IF NOT EXISTS tasks_user_username_lower_idx ON auth_user (lower(username))',
+                'CREATE INDEX IF NOT EXISTS tasks_user_email_lower_idx ON auth_user (lower(email))',
+                'DROP INDEX IF EXISTS tasks_user_email_idx',
+            ],
+            [
+                'CREATE INDEX IF NOT EXISTS tasks_user_email_idx ON auth_user (email)',
+                'DROP INDEX IF EXISTS tasks_user_email_lower_idx',
+                'DROP INDEX IF EXISTS tasks_user_username_lower_idx',
+            ],
+        ),
+    ]
@@ -1,9 +1,17 @@
-from django.db import models
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, router, transaction
+from django.db.models import F
+from django.db.models.signals import post_save, pre_save
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     managed_by = models.ManyToManyField(User, related_name='managed_users', blank=True)
+    # Part of every API token; bumping it revokes the user's tokens
+    token_version = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.user.username
@@ -22,6 +30,132 @@ class Task(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
     completion_report = models.TextField(blank=True, null=True)
     worked_hours = models.PositiveIntegerField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Bumped by every write; updates made with save_if_current() only go
+    # ahead if nobody else has written since the task was read
+    version = models.PositiveIntegerField(default=1)
+
+    # Fields whose value as loaded from the database signal handlers can
+    # compare against on save
+    TRACKED_FIELDS = ('assigned_to_id', 'status', 'due_date', 'worked_hours')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'assigned_to'], name='task_status_assignee_idx'),
+            models.Index(fields=['due_date'], name='task_due_date_idx'),
+            models.Index(fields=['assigned_to', 'updated_at'], name='task_assignee_updated_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.snapshot()
+        return instance
+
+    def snapshot(self):
+        self.loaded_values = {name: self.__dict__[name] for name in self.TRACKED_FIELDS if name in self.__dict__}
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            self.version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        super().save(*args, **kwargs)
+        self.snapshot()
+
+    def save_if_current(self, fields):
+        """
+        Write ``fields`` with a single ``UPDATE ... WHERE id = ? AND version = ?``
+        against the version this task was read at, and bump it. Returns
+        ``False``, having written nothing, when someone else has saved the task
+        since. Sends ``pre_save``/``post_save`` with ``update_fields`` like
+        ``save()`` does, in the same transaction as the write.
+        """
+        fields = {*fields, 'updated_at'}
+        using = router.db_for_write(Task, instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            pre_save.send(sender=Task, instance=self, raw=False, using=using, update_fields=frozenset(fields))
+            values = {}
+            for name in fields:
+                field = self._meta.get_field(name)
+                values[field.attname] = field.pre_save(self, add=False)
+            written = Task.objects.using(using).filter(pk=self.pk, version=self.version).update(
+                version=F('version') + 1, **values,
+            )
+            if not written:
+                return False
+            self.version += 1
+            post_save.send(sender=Task, instance=self, created=False, raw=False, using=using, update_fields=frozenset(fields))
+        self.snapshot()
+        return True
+
+    def apply_completion_rules(self):
+        # Reports and hours only belong to completed tasks
+        if self.status != 'Completed':
+            self.completion_report = None
+            self.worked_hours = None
+
+
+class TaskTombstone(models.Model):
+    """
+    Marks a task as gone for a user, so delta syncs can report deletes.
+
+    Kept for ``TOMBSTONE_RETENTION_DAYS``; ``prune_tombstones`` deletes older
+    ones, and syncs from before that start over.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='task_tombstones')
+    task_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at'], name='tombstone_user_deleted_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f'Task {self.task_id} removed for {self.user_id}'
+
+    @staticmethod
+    def retention_cutoff():
+        """Tombstones older than this may have been pruned."""
+        return timezone.now() - timedelta(days=settings.TOMBSTONE_RETENTION_DAYS)
+
+
+class TaskRollup(models.Model):
+    """Number of tasks and worked hours per user, status and due date, kept current by signals."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='task_rollups')
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES)
+    day = models.DateField()
+    task_count = models.IntegerField(default=0)
+    worked_hours = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'status', 'day'], name='rollup_user_status_day_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} {self.status} {self.day}: {self.task_count}'
+
+
+class AdminVisibility(models.Model):
+    """
+    One row per admin and user they manage, kept in step with
+    ``UserProfile.managed_by`` by signals, so team scoping is a lookup on a
+    single indexed table.
+    """
+    admin = models.ForeignKey(User, on_delete=models.CASCADE, related_name='visible_users')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='visible_to')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['admin', 'user'], name='visibility_admin_user_uniq'),
+        ]
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return f'{self.admin_id} sees {self.user_id}'
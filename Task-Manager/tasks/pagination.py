@@ -0,0 +1,96 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Seek pagination over ``(key, pk)``.
+
+    Each page is fetched with a ``WHERE (key, pk) > (last_key, last_pk)``
+    condition instead of an OFFSET, so page 1000 costs the same as page 1 as
+    long as ``key`` is indexed. ``key`` is a model field or a text
+    annotation of ``queryset``, such as ``Lower('username')``.
+    """
+
+    def __init__(self, queryset, key, per_page):
+        self.queryset = queryset
+        self.key = key
+        self.per_page = per_page
+        self.field = None if key in queryset.query.annotations else queryset.model._meta.get_field(key)
+
+    def encode(self, obj):
+        value = getattr(obj, self.key) if self.field is None else self.field.value_to_string(obj)
+        return f'{value}~{obj.pk}'
+
+    def decode(self, cursor):
+        try:
+            value, pk = cursor.rsplit('~', 1)
+            return (value if self.field is None else self.field.to_python(value)), int(pk)
+        except (AttributeError, ValueError, ValidationError):
+            return None
+
+    def page(self, after=None, before=None):
+        key = self.key
+        position = self.decode(before) if before else None
+        if position:
+            value, pk = position
+            queryset = self.queryset.filter(
+                Q(**{f'{key}__lt': value}) | Q(**{key: value, 'pk__lt': pk})
+            ).order_by(f'-{key}', '-pk')
+            rows = list(queryset[:self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            return KeysetPage(
+                rows,
+                next_cursor=self.encode(rows[-1]) if rows else None,
+                previous_cursor=self.encode(rows[0]) if has_previous else None,
+            )
+
+        queryset = self.queryset.order_by(key, 'pk')
+        position = self.decode(after) if after else None
+        if position:
+            value, pk = position
+            queryset = queryset.filter(Q(**{f'{key}__gt': value}) | Q(**{key: value, 'pk__gt': pk}))
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode(rows[-1]) if has_next else None,
+            previous_cursor=self.encode(rows[0]) if position and rows else None,
+        )
+
+
+class KeysetPaginationMixin:
+    """ListView mixin that swaps the OFFSET paginator for ``KeysetPaginator``."""
+    paginate_key = None
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, self.paginate_key, page_size)
+        page = paginator.page(
+            after=self.request.GET.get('after'),
+            before=self.request.GET.get('before'),
+        )
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,28 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # optional, see requirements.txt
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` that encodes with orjson when it is installed.
+
+    The bytes are the same as ``JSONRenderer``'s default compact, unicode
+    output. Indented output (``?indent=`` or an ``Accept`` parameter) and
+    installs without orjson use the standard encoder.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=encoders.JSONEncoder().default)
+        except orjson.JSONEncodeError:
+            # e.g. lone surrogates, which the standard encoder escapes
+            return super().render(data, accepted_media_type, renderer_context)
+        # JSONRenderer escapes these for embedding in JavaScript; orjson does not
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
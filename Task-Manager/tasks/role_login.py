@@ -1,14 +1,15 @@
 from django.contrib.auth.views import LoginView
 from django.shortcuts import redirect
 from django.urls import reverse
+from .roles import has_role
 
 class RoleBasedLoginView(LoginView):
     def get_success_url(self):
         user = self.request.user
-        if user.groups.filter(name='SuperAdmin').exists():
+        if has_role(user, 'SuperAdmin'):
             return reverse('user_list')
-        elif user.groups.filter(name='Admin').exists():
+        elif has_role(user, 'Admin'):
             return reverse('task_list_admin')
-        elif user.groups.filter(name='User').exists():
+        elif has_role(user, 'User'):
             return reverse('profile')
         return super().get_success_url()
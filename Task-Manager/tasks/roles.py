@@ -0,0 +1,82 @@
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+
+ROLE_NAMES = ('User', 'Admin', 'SuperAdmin')
+
+# Role changes delete the cached entry, which every worker sees as long as
+# CACHES['default'] is shared between them (see DJANGO_CACHE_DIR); the
+# timeout only keeps entries of inactive users from piling up.
+ROLE_CACHE_TIMEOUT = 300
+
+
+# Group ids never change while the group exists, so each process looks them
+# up once, on first use
+_group_ids = {}
+
+
+def _cache_key(user_id):
+    return f'tasks:roles:{user_id}'
+
+
+def get_roles(user):
+    """
+    Return the names of the groups ``user`` belongs to.
+
+    Roles are remembered on the user instance for the rest of the request and
+    in the default cache across requests, so a page that checks permissions in
+    several places only pays for the group query once. Role changes delete
+    the cached entry, so workers only agree on them when that cache is shared.
+    """
+    if user is None or not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, '_role_cache', None)
+    if roles is None:
+        key = _cache_key(user.pk)
+        roles = cache.get(key)
+        if roles is None:
+            roles = frozenset(user.groups.values_list('name', flat=True))
+            cache.set(key, roles, ROLE_CACHE_TIMEOUT)
+        user._role_cache = roles
+    return roles
+
+
+def has_role(user, *names):
+    return not get_roles(user).isdisjoint(names)
+
+
+def invalidate_roles(*user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+async def aget_roles(user):
+    """Async counterpart of ``get_roles`` for use in async views."""
+    if user is None or not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, '_role_cache', None)
+    if roles is None:
+        key = _cache_key(user.pk)
+        roles = await cache.aget(key)
+        if roles is None:
+            roles = frozenset([name async for name in user.groups.values_list('name', flat=True)])
+            await cache.aset(key, roles, ROLE_CACHE_TIMEOUT)
+        user._role_cache = roles
+    return roles
+
+
+async def ahas_role(user, *names):
+    return not (await aget_roles(user)).isdisjoint(names)
+
+
+def role_group_id(name):
+    """
+    The primary key of the group for role ``name``, for ``user.groups.add()``
+    and ``remove()``. The group is created if it is missing.
+    """
+    group_id = _group_ids.get(name)
+    if group_id is None:
+        group_id = _group_ids[name] = Group.objects.get_or_create(name=name)[0].pk
+    return group_id
+
+
+def forget_group_ids():
+    _group_ids.clear()
@@ -0,0 +1,67 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Task, TaskRollup
+
+
+def bucket(values):
+    return values['assigned_to_id'], values['status'], values['due_date']
+
+
+def current_values(task):
+    return {name: getattr(task, name) for name in Task.TRACKED_FIELDS}
+
+
+def collect(changes):
+    """
+    Turn ``(old_values, new_values)`` pairs into per-bucket deltas.
+
+    Either side may be ``None`` for creates and deletes.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for old, new in changes:
+        if old is not None:
+            delta = deltas[bucket(old)]
+            delta[0] -= 1
+            delta[1] -= old['worked_hours'] or 0
+        if new is not None:
+            delta = deltas[bucket(new)]
+            delta[0] += 1
+            delta[1] += new['worked_hours'] or 0
+    return {key: delta for key, delta in deltas.items() if delta != [0, 0]}
+
+
+def apply(changes):
+    for (user_id, status, day), (count, hours) in collect(changes).items():
+        rollups = TaskRollup.objects.filter(user_id=user_id, status=status, day=day)
+        increment = {'task_count': F('task_count') + count, 'worked_hours': F('worked_hours') + hours}
+        if rollups.update(**increment):
+            continue
+        try:
+            with transaction.atomic():
+                TaskRollup.objects.create(user_id=user_id, status=status, day=day, task_count=count, worked_hours=hours)
+        except IntegrityError:
+            # Another writer created the row first
+            rollups.update(**increment)
+
+
+def rebuild():
+    """Recompute every rollup from the task table in one INSERT ... SELECT."""
+    rows = (
+        Task.objects.order_by()
+        .values('assigned_to_id', 'status', 'due_date')
+        .annotate(task_count=Count('id'), worked_hours=Coalesce(Sum('worked_hours'), 0))
+        .values_list('assigned_to_id', 'status', 'due_date', 'task_count', 'worked_hours')
+    )
+    select_sql, params = rows.query.sql_with_params()
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(TaskRollup._meta.get_field(name).column)
+                        for name in ('user', 'status', 'day', 'task_count', 'worked_hours'))
+    with transaction.atomic():
+        TaskRollup.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(f'INSERT INTO {quote(TaskRollup._meta.db_table)} ({columns}) {select_sql}', params)
+    return TaskRollup.objects.count()
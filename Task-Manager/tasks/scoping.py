@@ -0,0 +1,22 @@
+from django.contrib.auth.models import User
+
+from .models import Task
+from .roles import has_role
+from .visibility import visible_user_ids
+
+
+def tasks_for(user):
+    """Tasks ``user`` may see: all for SuperAdmins, their team's for Admins, their own otherwise."""
+    if has_role(user, 'SuperAdmin'):
+        return Task.objects.all()
+    if has_role(user, 'Admin'):
+        # Admins see tasks of users they manage
+        return Task.objects.filter(assigned_to__in=visible_user_ids(user))
+    return Task.objects.filter(assigned_to=user)
+
+
+def users_for(user):
+    """Users ``user`` may assign tasks to."""
+    if has_role(user, 'SuperAdmin'):
+        return User.objects.all()
+    return User.objects.filter(pk__in=visible_user_ids(user))
@@ -0,0 +1,140 @@
+"""
+Full-text search over task title, description and completion report.
+
+On SQLite the text is indexed in an FTS5 table that mirrors ``tasks_task``
+and is kept in sync by triggers, so bulk writes and ``QuerySet.update()`` are
+covered too. Other databases fall back to ``icontains`` filters.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q, Value
+from django.db.models.functions import Lower
+
+FTS_TABLE = 'tasks_task_fts'
+
+FTS_SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, completion_report,
+        content='tasks_task', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON tasks_task BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, completion_report)
+        VALUES (new.id, new.title, new.description, new.completion_report);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON tasks_task BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, completion_report)
+        VALUES ('delete', old.id, old.title, old.description, old.completion_report);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description, completion_report ON tasks_task BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, completion_report)
+        VALUES ('delete', old.id, old.title, old.description, old.completion_report);
+        INSERT INTO {FTS_TABLE}(rowid, title, description, completion_report)
+        VALUES (new.id, new.title, new.description, new.completion_report);
+    END
+    """,
+]
+
+# Title matches count for more than matches in the longer text columns
+RANK_SQL = f'bm25({FTS_TABLE}, 10.0, 2.0, 1.0)'
+
+
+def is_supported(connection):
+    return connection.vendor == 'sqlite'
+
+
+def install(connection):
+    """
+    Create the FTS table and its triggers if they are missing.
+
+    SQLite drops a table's triggers whenever a migration rebuilds it, so this
+    runs after every ``migrate``; the index is rebuilt when anything had to be
+    recreated.
+    """
+    if not is_supported(connection) or 'tasks_task' not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+            [FTS_TABLE, f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au'],
+        )
+        if cursor.fetchone()[0] == 4:
+            return
+        for statement in FTS_SCHEMA:
+            cursor.execute(statement)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall(connection):
+    if not is_supported(connection):
+        return
+    with connection.cursor() as cursor:
+        for suffix in ('_ai', '_ad', '_au'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}{suffix}')
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def search_tasks(queryset, query, ranked=True):
+    """
+    Narrow ``queryset`` to tasks matching every word of ``query``.
+
+    Words match as prefixes. With ``ranked`` the best matches come first.
+    """
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return queryset.none()
+    if not is_supported(connections[queryset.db]):
+        for term in terms:
+            queryset = queryset.filter(
+                Q(title__icontains=term) | Q(description__icontains=term) | Q(completion_report__icontains=term)
+            )
+        return queryset
+    match = ' '.join(f'"{term}"*' for term in terms)
+    queryset = queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = tasks_task.id', f'{FTS_TABLE} MATCH %s'],
+        params=[match],
+        select={'rank': RANK_SQL} if ranked else None,
+    )
+    return queryset.extra(order_by=['rank']) if ranked else queryset
+
+
+def prefix_range(field, prefix):
+    """
+    ``field`` starts with ``prefix``, as a range an index can seek to.
+
+    ``startswith`` compiles to a ``LIKE`` that SQLite only runs as a scan.
+    ``field`` is expected to be lowercased with ``Lower()``; the bounds are
+    lowercased by the database too, so both sides fold case the same way.
+    """
+    return Q(**{f'{field}__gte': Lower(Value(prefix)), f'{field}__lt': Lower(Value(prefix + '\U0010ffff'))})
+
+
+def user_search_field(query):
+    """
+    The column a user lookup searches: email for queries with an ``@``,
+    username otherwise. One column per query keeps it a single index seek
+    that can stop after a page instead of sorting every match.
+    """
+    return 'email' if '@' in query else 'username'
+
+
+def search_users(queryset, query):
+    """
+    Narrow ``queryset`` to users whose username (or email) starts with
+    ``query``, ignoring case. The lowercased column is annotated as
+    ``search_key``, which the ``lower(username)``/``lower(email)`` indexes
+    cover, so results can be ordered and paginated by it.
+    """
+    query = query.strip()
+    queryset = queryset.annotate(search_key=Lower(user_search_field(query)))
+    if not query:
+        return queryset
+    return queryset.filter(prefix_range('search_key', query))
@@ -1,22 +1,146 @@
-from rest_framework import serializers
+from functools import lru_cache
+
+from django.utils import timezone
+from rest_framework import ISO_8601, relations, serializers
+from rest_framework.settings import api_settings
+from .conditional import VersionConflict
 from .models import Task
 
 class TaskSerializer(serializers.ModelSerializer):
     class Meta:
         model = Task
         fields = '__all__'
+        read_only_fields = ['version']
 
-class TaskUpdateSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Task
-        fields = ['status', 'completion_report', 'worked_hours']
 
+# Fields whose representation is the database value itself
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField, serializers.CharField, serializers.ChoiceField,
+    serializers.IntegerField, relations.PrimaryKeyRelatedField,
+)
+
+
+@lru_cache(maxsize=None)
+def values_plan(serializer_class):
+    """The ``.values()`` columns for ``serializer_class`` and the fields that need converting."""
+    fields = serializer_class().fields
+    for name, field in fields.items():
+        if field.source != name or field.write_only:
+            raise TypeError(f'{serializer_class.__name__}.{name} cannot be read from .values()')
+    converting = [(name, field) for name, field in fields.items() if not isinstance(field, PASSTHROUGH_FIELDS)]
+    return list(fields), converting
+
+
+def datetime_representation(field):
+    """
+    ``field.to_representation`` for ISO 8601 output, with the time zone
+    looked up once instead of for every value.
+    """
+    if getattr(field, 'format', api_settings.DATETIME_FORMAT) != ISO_8601 or hasattr(field, 'timezone'):
+        return field.to_representation
+    field_timezone = field.default_timezone()
+
+    def to_representation(value):
+        if field_timezone is None or not timezone.is_aware(value):
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+    return to_representation
+
+
+class ValuesSerializer:
+    """
+    Read-only fast path for list endpoints.
+
+    Gives the same ``data`` as ``serializer_class(queryset, many=True)``,
+    but reads ``.values()`` rows instead of building model instances and
+    only runs the fields whose representation differs from the database
+    value (dates, times) through the serializer. Serializers whose fields
+    are computed or traverse relations can't use it.
+
+    ``fields`` limits the output, and the columns read, to a subset of the
+    serializer's fields; the order stays the serializer's.
+    """
+    serializer_class = None
+
+    def __init__(self, queryset, fields=None):
+        self.queryset = queryset
+        columns, _ = values_plan(self.serializer_class)
+        if fields:
+            unknown = set(fields).difference(columns)
+            if unknown:
+                raise serializers.ValidationError(
+                    {'fields': [f'Unknown field(s): {", ".join(sorted(unknown))}. Choose from: {", ".join(columns)}.']}
+                )
+            columns = [column for column in columns if column in fields]
+        self.columns = columns
+
+    @property
+    def data(self):
+        return self.to_representation(self.queryset.values(*self.columns))
+
+    async def adata(self):
+        return self.to_representation([row async for row in self.queryset.values(*self.columns)])
+
+    def to_representation(self, rows):
+        _, converting = values_plan(self.serializer_class)
+        converters = [
+            (name, datetime_representation(field) if isinstance(field, serializers.DateTimeField) else field.to_representation)
+            for name, field in converting if name in self.columns
+        ]
+        rows = list(rows)
+        for row in rows:
+            for name, to_representation in converters:
+                if row[name] is not None:
+                    row[name] = to_representation(row[name])
+        return rows
+
+
+class TaskValuesSerializer(ValuesSerializer):
+    serializer_class = TaskSerializer
+
+
+def requested_fields(query_params):
+    """The field names asked for with ``?fields=a,b``, or ``None`` for all of them."""
+    return [name.strip() for name in query_params.get('fields', '').split(',') if name.strip()] or None
+
+class CompletionRulesMixin:
     def validate(self, data):
         if data.get('status') == 'Completed':
             if not data.get('completion_report') or not data.get('worked_hours'):
                 raise serializers.ValidationError("Completion report and worked hours are required for completed tasks.")
         return data
 
+class TaskUpdateSerializer(CompletionRulesMixin, serializers.ModelSerializer):
+    # The version the client read; defaults to the one just loaded
+    version = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = Task
+        fields = ['status', 'completion_report', 'worked_hours', 'version']
+
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.apply_completion_rules()
+        if not instance.save_if_current(['status', 'completion_report', 'worked_hours']):
+            raise VersionConflict()
+        return instance
+
+class TaskBulkCreateSerializer(CompletionRulesMixin, serializers.ModelSerializer):
+    # Checked against ids preloaded by the view instead of one query per item
+    assigned_to = serializers.IntegerField()
+
+    class Meta:
+        model = Task
+        fields = ['title', 'description', 'assigned_to', 'due_date', 'status', 'completion_report', 'worked_hours']
+
+    def validate_assigned_to(self, value):
+        if value not in self.context['assignable_ids']:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return value
+
 class TaskReportSerializer(serializers.ModelSerializer):
     class Meta:
         model = Task
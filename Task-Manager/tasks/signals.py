@@ -1,16 +1,224 @@
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-from django.contrib.auth.models import User
-from .models import UserProfile
+from django.db import connections
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed, pre_delete, post_migrate
+from django.dispatch import Signal, receiver
+from django.contrib.auth.models import User, Group
+from .models import AdminVisibility, Task, TaskTombstone, UserProfile
+from . import caching, events, rollups, search, visibility
+from .roles import forget_group_ids, invalidate_roles
+from .tokens import forget_token_versions, revoke_tokens
 
+# Sent by bulk writers (which bypass post_save) inside their transaction,
+# with the lists of ``created`` and ``updated`` tasks.
+task_batch_saved = Signal()
+
+# Profiles are created once with their user and saved only when they change
+# themselves; users saved before this existed get one from
+# UserProfileView.get_object
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         UserProfile.objects.create(user=instance)
 
+
+# Role cache invalidation. API tokens carry the roles they were issued
+# with, so role changes revoke them too.
+def roles_changed(*user_ids):
+    if user_ids:
+        invalidate_roles(*user_ids)
+        revoke_tokens(*user_ids)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        # user.groups.add/remove/clear
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            instance.__dict__.pop('_role_cache', None)
+            roles_changed(instance.pk)
+    elif action == 'pre_clear':
+        # group.user_set.clear() does not report which users it removes
+        roles_changed(*instance.user_set.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove') and pk_set:
+        roles_changed(*pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, created=False, **kwargs):
+    forget_group_ids()
+    # A renamed or deleted group changes the roles of all of its members
+    if instance.pk and not created:
+        roles_changed(*instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    invalidate_roles(instance.pk)
+
+
+# Token revocation
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    try:
-        instance.userprofile.save()
-    except UserProfile.DoesNotExist:
-        pass
\ No newline at end of file
+def user_credentials_changed(sender, instance, created, **kwargs):
+    # set_password() leaves the raw password in _password until save() is done
+    if not created and (instance._password is not None or not instance.is_active):
+        revoke_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_removed(sender, instance, **kwargs):
+    # The profile holding the version is gone, which fails the version check
+    forget_token_versions(instance.pk)
+
+
+# Tombstones for delta sync
+@receiver(post_save, sender=Task)
+def task_reassigned(sender, instance, created, **kwargs):
+    previous = getattr(instance, 'loaded_values', {}).get('assigned_to_id')
+    if not created and previous and previous != instance.assigned_to_id:
+        # The task disappears from the previous assignee's list
+        TaskTombstone.objects.create(user_id=previous, task_id=instance.pk)
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, origin=None, **kwargs):
+    # Nobody is left to sync when the task goes because its user was deleted
+    if getattr(origin, 'model', type(origin)) is User:
+        return
+    TaskTombstone.objects.create(user_id=instance.assigned_to_id, task_id=instance.pk)
+
+
+# Dashboard rollups
+@receiver(pre_save, sender=Task)
+def load_previous_values(sender, instance, **kwargs):
+    # Tasks built by hand or loaded with deferred fields don't know what the
+    # row held before this save
+    loaded = getattr(instance, 'loaded_values', {})
+    if instance.pk and len(loaded) < len(Task.TRACKED_FIELDS):
+        instance.loaded_values = Task.objects.filter(pk=instance.pk).values(*Task.TRACKED_FIELDS).first() or {}
+
+
+@receiver(post_save, sender=Task)
+def rollup_task_saved(sender, instance, created, **kwargs):
+    old = None if created else (getattr(instance, 'loaded_values', None) or None)
+    rollups.apply([(old, rollups.current_values(instance))])
+
+
+@receiver(post_delete, sender=Task)
+def rollup_task_deleted(sender, instance, origin=None, **kwargs):
+    # The user's rollups are being deleted along with their tasks
+    if getattr(origin, 'model', type(origin)) is User:
+        return
+    rollups.apply([(rollups.current_values(instance), None)])
+
+
+@receiver(task_batch_saved, sender=Task)
+def rollup_task_batch_saved(sender, created=(), updated=(), **kwargs):
+    changes = [(None, rollups.current_values(task)) for task in created]
+    changes += [(task.loaded_values, rollups.current_values(task)) for task in updated]
+    rollups.apply(changes)
+
+
+# Admin visibility index
+@receiver(m2m_changed, sender=UserProfile.managed_by.through)
+def visibility_team_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # admin.managed_users.add/remove/clear, with profile ids
+        visible = AdminVisibility.objects.filter(admin=instance)
+        if action == 'post_add' and pk_set:
+            user_ids = UserProfile.objects.filter(pk__in=pk_set).values_list('user_id', flat=True)
+            visibility.add((instance.pk, user_id) for user_id in user_ids)
+        elif action == 'post_remove' and pk_set:
+            visible.filter(user__userprofile__in=pk_set).delete()
+        elif action == 'post_clear':
+            visible.delete()
+    else:
+        # profile.managed_by.add/remove/clear, with admin ids
+        visible = AdminVisibility.objects.filter(user_id=instance.user_id)
+        if action == 'post_add' and pk_set:
+            visibility.add((admin_id, instance.user_id) for admin_id in pk_set)
+        elif action == 'post_remove' and pk_set:
+            visible.filter(admin__in=pk_set).delete()
+        elif action == 'post_clear':
+            visible.delete()
+
+
+@receiver(post_delete, sender=UserProfile)
+def visibility_profile_deleted(sender, instance, origin=None, **kwargs):
+    # The profile's links went with it; rows of a deleted user cascade
+    if getattr(origin, 'model', type(origin)) is User:
+        return
+    AdminVisibility.objects.filter(user_id=instance.user_id).delete()
+
+
+# Live events
+@receiver(post_save, sender=Task)
+def publish_task_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, 'loaded_values', {}).get('assigned_to_id')
+    events.publish_on_commit([('created' if created else 'updated', instance, previous)])
+
+
+@receiver(post_delete, sender=Task)
+def publish_task_deleted(sender, instance, **kwargs):
+    events.publish_on_commit([('deleted', instance, None)])
+
+
+@receiver(task_batch_saved, sender=Task)
+def publish_task_batch_saved(sender, created=(), updated=(), **kwargs):
+    changes = [('created', task, None) for task in created]
+    changes += [('updated', task, task.loaded_values.get('assigned_to_id')) for task in updated]
+    events.publish_on_commit(changes)
+
+
+# Versioned response cache
+@receiver(post_save, sender=Task)
+def expire_task_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, 'loaded_values', {}).get('assigned_to_id')
+    caching.expire_assignees_on_commit({instance.assigned_to_id, previous})
+
+
+@receiver(post_delete, sender=Task)
+def expire_task_deleted(sender, instance, origin=None, **kwargs):
+    # expire_user_deleted covers all of a deleted user's tasks at once
+    if getattr(origin, 'model', type(origin)) is User:
+        return
+    caching.expire_assignees_on_commit({instance.assigned_to_id})
+
+
+@receiver(task_batch_saved, sender=Task)
+def expire_task_batch_saved(sender, created=(), updated=(), **kwargs):
+    user_ids = {task.assigned_to_id for task in (*created, *updated)}
+    user_ids.update(task.loaded_values.get('assigned_to_id') for task in updated)
+    caching.expire_assignees_on_commit(user_ids)
+
+
+@receiver(m2m_changed, sender=UserProfile.managed_by.through)
+def expire_team_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # admin.managed_users.add/remove/clear
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            caching.expire_on_commit(events.team_channel(instance.pk))
+    elif action == 'pre_clear':
+        # profile.managed_by.clear() does not report which admins it removes
+        caching.expire_on_commit(*map(events.team_channel, instance.managed_by.values_list('pk', flat=True)))
+    elif action in ('post_add', 'post_remove') and pk_set:
+        caching.expire_on_commit(*map(events.team_channel, pk_set))
+
+
+@receiver(post_save, sender=User)
+def expire_user_changed(sender, instance, created, update_fields=None, **kwargs):
+    # Lists show usernames; logins only touch last_login
+    if not created and (update_fields is None or 'username' in update_fields):
+        caching.expire_assignees_on_commit({instance.pk})
+
+
+@receiver(pre_delete, sender=User)
+def expire_user_deleted(sender, instance, **kwargs):
+    caching.expire_assignees_on_commit({instance.pk})
+
+
+# Full-text search
+@receiver(post_migrate)
+def ensure_search_index(sender, using, **kwargs):
+    # Rebuilding tasks_task in a later migration drops the FTS triggers
+    if sender.name == 'tasks':
+        search.install(connections[using])
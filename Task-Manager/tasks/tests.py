@@ -1,3 +1,819 @@
-from django.test import TestCase
+import base64
+import copy
+import csv
+import json
+import re
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+
+from core import replicas
+
+from . import benchmark, caching, rollups, search, visibility
+from .admin_views import UserLookupView
+from .authentication import issue_token
+from .conditional import VersionConflict
+from .models import Task, TaskRollup, TaskTombstone, UserProfile
+from .pagination import KeysetPaginator
+from .renderers import FastJSONRenderer
+from .serializers import TaskSerializer, TaskUpdateSerializer, TaskValuesSerializer
+from .roles import ROLE_NAMES, role_group_id
+from .scoping import tasks_for, users_for
+from .search import search_tasks
+from .tokens import revoke_tokens
+
+
+class EndpointBudgetTests(TestCase):
+    """
+    Replays every endpoint against a small seeded dataset and checks its query
+    count against ``benchmarks/budgets.json``. Latency is left to the
+    ``benchmark`` command, where it runs against a full-size dataset.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_data', users=40, admins=4, tasks=400, prefix='bench', stdout=StringIO())
+
+    def setUp(self):
+        cache.clear()
+
+    def test_every_route_has_a_case(self):
+        self.assertEqual(benchmark.check_coverage(), [])
+
+    def test_every_case_has_a_budget(self):
+        budgets = benchmark.load_budgets()
+        self.assertEqual([case.label for case in benchmark.CASES if case.label not in budgets], [])
+
+    def test_query_budgets(self):
+        results = benchmark.BenchmarkRunner(iterations=2).run()
+        regressions = benchmark.compare(results, benchmark.load_budgets(), check_latency=False)
+        self.assertEqual(regressions, [], '\n'.join(regressions))
+
+    def test_compare_reports_regressions(self):
+        budgets = {'GET /x [anon]': {'queries': 3, 'p95_ms': 10}}
+        result = {'queries': 4, 'p50_ms': 1, 'p95_ms': 20, 'p99_ms': 30, 'status': [200]}
+        self.assertEqual(len(benchmark.compare({'GET /x [anon]': result}, budgets)), 2)
+        self.assertEqual(len(benchmark.compare({'GET /x [anon]': result}, budgets, check_latency=False)), 1)
+        self.assertEqual(benchmark.compare({'GET /y [anon]': result}, budgets), ['GET /y [anon]: no budget'])
+
+
+class TokenRevocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('token_user', password='first-password')
+        cls.user.groups.add(role_group_id('User'))
+
+    def setUp(self):
+        cache.clear()
+        self.token = str(issue_token(self.user).access_token)
+
+    def get(self, token):
+        return self.client.get('/tasks/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def assertRevoked(self):
+        self.assertEqual(self.get(self.token).status_code, 401)
+
+    def test_token_is_accepted_until_revoked(self):
+        self.assertEqual(self.get(self.token).status_code, 200)
+        revoke_tokens(self.user.pk)
+        self.assertRevoked()
+        self.assertEqual(self.get(issue_token(self.user).access_token).status_code, 200)
+
+    def test_password_change_revokes(self):
+        self.get(self.token)
+        self.user.set_password('second-password')
+        self.user.save()
+        self.assertRevoked()
+
+    def test_deactivation_revokes(self):
+        self.get(self.token)
+        self.user.is_active = False
+        self.user.save()
+        self.assertRevoked()
+
+    def test_role_change_revokes(self):
+        self.get(self.token)
+        self.user.groups.add(role_group_id('Admin'))
+        self.assertRevoked()
+
+    def test_deleted_user_is_rejected(self):
+        self.get(self.token)
+        self.user.delete()
+        self.assertRevoked()
+
+    def test_tampered_roles_fail_the_signature(self):
+        header, payload, signature = self.token.split('.')
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        claims['roles'] = ['SuperAdmin']
+        payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).rstrip(b'=').decode()
+        self.assertEqual(self.get(f'{header}.{payload}.{signature}').status_code, 401)
+
+
+class ReplicaRoutingTests(TestCase):
+    def route(self, response):
+        middleware = replicas.ReplicaRoutingMiddleware(lambda request: response(replicas._replica_reads.get()))
+        return middleware(RequestFactory().get('/tasks/'))
+
+    def test_replica_reads_end_with_the_response(self):
+        self.assertEqual(self.route(lambda reads: HttpResponse(str(reads))).content, b'True')
+        self.assertFalse(replicas._replica_reads.get())
+
+    def test_streamed_content_is_read_with_the_request_flag(self):
+        def content():
+            yield str(replicas._replica_reads.get())
+
+        response = self.route(lambda reads: StreamingHttpResponse(content()))
+        self.assertFalse(replicas._replica_reads.get())
+        self.assertEqual(b''.join(response.streaming_content), b'True')
+        self.assertFalse(replicas._replica_reads.get())
+
+
+    def test_delta_sync_reads_the_primary(self):
+        user = User.objects.create_user('replica_user')
+        user.groups.add(role_group_id('User'))
+        task = Task.objects.create(title='Fresh', description='', due_date='2025-01-01', assigned_to=user)
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {issue_token(user).access_token}'}
+        self.client.get('/tasks/', **auth)
+        # Every read routed to the replica fails, as if it had not caught up
+        with mock.patch('core.replicas.replicas', return_value=('lagging_replica',)):
+            response = self.client.get('/tasks/changes/', **auth)
+        self.assertEqual([row['id'] for row in response.json()['changed']], [task.pk])
+
+class StartupTests(TestCase):
+    def test_startup_opens_no_database_connections(self):
+        self.assertEqual(benchmark.measure_startup(runs=1)['connections'], 0)
+
+    def test_role_groups_come_from_migrations(self):
+        groups = dict(Group.objects.filter(name__in=ROLE_NAMES).values_list('name', 'pk'))
+        self.assertEqual(sorted(groups), sorted(ROLE_NAMES))
+        self.assertEqual({name: role_group_id(name) for name in ROLE_NAMES}, groups)
+        # Resolved once per process
+        with self.assertNumQueries(0):
+            role_group_id('User')
+
+
+class VersionedCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('cache_admin')
+        cls.admin.groups.add(role_group_id('Admin'))
+        cls.user = User.objects.create_user('cache_user')
+        cls.user.groups.add(role_group_id('User'))
+        cls.task = Task.objects.create(title='Cached', description='', due_date='2025-01-01', assigned_to=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        caching.get_cache().clear()
+
+    def get(self, user, path):
+        self.client.force_login(user)
+        return self.client.get(path).content.decode()
+
+    def test_pages_subscribe_to_live_events_only_when_enabled(self):
+        self.assertNotIn('EventSource', self.get(self.user, '/my-tasks/'))
+        with self.settings(TASK_EVENTS_LIVE=True):
+            self.assertIn('EventSource', self.get(self.user, '/my-tasks/'))
+            self.assertIn('EventSource', self.get(self.admin, '/admin/tasks/'))
+
+    def test_task_writes_expire_the_assignees_lists(self):
+        self.assertIn('Pending', self.get(self.user, '/my-tasks/'))
+        self.task.status = 'In Progress'
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.filter(pk=self.task.pk).update(status='In Progress')
+        # Writes that bypass the signals are not seen...
+        self.assertNotIn('In Progress</td>', self.get(self.user, '/my-tasks/'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.save()
+        # ...saves are
+        self.assertIn('In Progress</td>', self.get(self.user, '/my-tasks/'))
+
+    def test_team_changes_expire_the_admins_list(self):
+        self.assertNotIn('cache_user', self.get(self.admin, '/admin/tasks/'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.managed_users.add(self.user.userprofile)
+        self.assertIn('cache_user', self.get(self.admin, '/admin/tasks/'))
+        with self.captureOnCommitCallbacks(execute=True):
+            UserProfile.objects.get(user=self.user).managed_by.clear()
+        self.assertNotIn('cache_user', self.get(self.admin, '/admin/tasks/'))
+
+
+class AdminVisibilityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admins = [User.objects.create_user(f'visibility_admin_{n}') for n in range(2)]
+        cls.users = [User.objects.create_user(f'visibility_user_{n}') for n in range(3)]
+        for admin in cls.admins:
+            admin.groups.add(role_group_id('Admin'))
+        Task.objects.create(title='Shared', description='', due_date='2025-01-01', assigned_to=cls.users[0])
+
+    def assertInStep(self):
+        self.assertEqual(visibility.diff(), (set(), set()))
+
+    def test_every_team_change_keeps_the_index_in_step(self):
+        first, second = self.admins
+        profiles = [user.userprofile for user in self.users]
+        first.managed_users.add(*profiles)
+        profiles[0].managed_by.add(second)
+        self.assertInStep()
+        first.managed_users.remove(profiles[1])
+        profiles[0].managed_by.remove(first)
+        self.assertInStep()
+        profiles[2].managed_by.clear()
+        second.managed_users.clear()
+        self.assertInStep()
+        first.managed_users.set(profiles)
+        profiles[1].delete()
+        self.users[2].delete()
+        self.assertInStep()
+
+    def test_scoping_reads_the_index(self):
+        profile = self.users[0].userprofile
+        profile.managed_by.add(*self.admins)
+        self.assertEqual(list(users_for(self.admins[0])), [self.users[0]])
+        self.assertEqual(tasks_for(self.admins[1]).count(), 1)
+        visibility.add([(self.admins[0].pk, self.users[1].pk)])
+        self.assertIn(self.users[1], users_for(self.admins[0]))
+        call_command('rebuild_visibility', stdout=StringIO())
+        self.assertNotIn(self.users[1], users_for(self.admins[0]))
+
+
+class UserLookupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.superadmin = User.objects.create_user('lookup_super')
+        cls.superadmin.groups.add(role_group_id('SuperAdmin'))
+        cls.admin = User.objects.create_user('lookup_admin', 'boss@example.com')
+        cls.admin.groups.add(role_group_id('Admin'))
+        cls.users = [User.objects.create_user(f'lookup_user_{n}', f'person{n}@example.com') for n in range(5)]
+        for user in cls.users:
+            user.groups.add(role_group_id('User'))
+        cls.admin.managed_users.add(*(user.userprofile for user in cls.users[:3]))
+
+    def lookup(self, viewer, **params):
+        self.client.force_login(viewer)
+        return self.client.get('/admin/users/lookup/', params)
+
+    def usernames(self, response):
+        return [user['username'] for user in response.json()['results']]
+
+    def test_lookup_is_scoped_paginated_and_by_prefix(self):
+        self.assertEqual(self.usernames(self.lookup(self.admin, q='lookup_')), ['lookup_user_0', 'lookup_user_1', 'lookup_user_2'])
+        self.assertEqual(self.usernames(self.lookup(self.superadmin, q='person3@')), ['lookup_user_3'])
+        self.assertEqual(self.usernames(self.lookup(self.superadmin, q='PERSON3@Example')), ['lookup_user_3'])
+        self.assertEqual(self.usernames(self.lookup(self.admin, q='Lookup_User_1')), ['lookup_user_1'])
+        self.assertEqual(self.usernames(self.lookup(self.superadmin, q='lookup_', role='Admin')), ['lookup_admin'])
+        self.assertEqual(self.lookup(self.superadmin, role='Nobody').status_code, 400)
+        with mock.patch.object(UserLookupView, 'paginate_by', 2):
+            first = self.lookup(self.superadmin, q='lookup_user').json()
+            second = self.lookup(self.superadmin, q='lookup_user', after=first['next']).json()
+        self.assertEqual([user['id'] for user in first['results'] + second['results']], [user.pk for user in self.users[:4]])
+
+    def test_forms_render_only_the_selected_user(self):
+        self.client.force_login(self.superadmin)
+        task = Task.objects.create(title='Picked', description='', due_date='2025-01-01', assigned_to=self.users[4])
+        page = self.client.get(f'/admin/tasks/{task.pk}/update/').content.decode()
+        self.assertIn(f'<option value="{self.users[4].pk}" selected>lookup_user_4</option>', page)
+        self.assertNotIn('lookup_user_3', page)
+        # Submitted choices are still checked against the caller's team
+        self.client.force_login(self.admin)
+        response = self.client.post('/admin/tasks/create/', {
+            'title': 'Outside', 'description': '', 'assigned_to': self.users[4].pk, 'due_date': '2025-01-01', 'status': 'Pending',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Task.objects.filter(title='Outside').exists())
+
+
+class ConditionalRequestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('etag_user')
+        cls.user.groups.add(role_group_id('User'))
+        cls.task = Task.objects.create(title='Polled', description='', due_date='2025-01-01', assigned_to=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        caching.get_cache().clear()
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {issue_token(self.user).access_token}'}
+
+    def test_unchanged_list_is_not_modified(self):
+        etag = self.client.get('/tasks/', **self.auth)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/tasks/', HTTP_IF_NONE_MATCH=etag, **self.auth)
+        self.assertEqual((response.status_code, response['ETag'], response.content), (304, etag, b''))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.save()
+        self.assertEqual(self.client.get('/tasks/', HTTP_IF_NONE_MATCH=etag, **self.auth).status_code, 200)
+
+    def test_if_modified_since_alone_never_hides_a_change(self):
+        first = self.client.get('/tasks/', **self.auth)
+        self.assertNotIn('Last-Modified', first)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.save()
+        response = self.client.get('/tasks/', HTTP_IF_MODIFIED_SINCE=http_date(), **self.auth)
+        self.assertEqual(response.status_code, 200)
+
+    def test_stale_if_match_is_rejected(self):
+        path = f'/tasks/{self.task.pk}/'
+        etag = self.client.patch(path, {'status': 'In Progress'}, content_type='application/json', **self.auth)['ETag']
+        response = self.client.patch(path, {'status': 'Pending'}, content_type='application/json', HTTP_IF_MATCH=etag, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.patch(path, {'status': 'Completed'}, content_type='application/json', HTTP_IF_MATCH=etag, **self.auth)
+        self.assertEqual(response.status_code, 412)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'Pending')
+
+
+class OptimisticConcurrencyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('version_user')
+        cls.user.groups.add(role_group_id('User'))
+        cls.task = Task.objects.create(
+            title='Contested', description='', due_date='2025-01-01', assigned_to=cls.user,
+            status='Completed', completion_report='Done', worked_hours=2,
+        )
+
+    def setUp(self):
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {issue_token(self.user).access_token}'}
+        self.path = f'/tasks/{self.task.pk}/'
+
+    def test_the_first_of_two_concurrent_writes_wins(self):
+        mine, theirs = Task.objects.get(pk=self.task.pk), Task.objects.get(pk=self.task.pk)
+        mine.status = theirs.status = 'In Progress'
+        self.assertTrue(theirs.save_if_current(['status']))
+        self.assertFalse(mine.save_if_current(['status']))
+        self.assertEqual(Task.objects.get(pk=self.task.pk).version, self.task.version + 1)
+
+    def test_update_is_one_write_with_the_completion_rules_applied(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.patch(self.path, {'status': 'Pending'}, content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len([query for query in captured if query['sql'].startswith('UPDATE "tasks_task"')]), 1)
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.completion_report, self.task.worked_hours, self.task.version), (None, None, 2))
+        self.assertEqual(response['ETag'], f'"task-{self.task.pk}-v2"')
+
+    def test_stale_versions_are_a_conflict(self):
+        response = self.client.patch(self.path, {'status': 'Pending', 'version': 0}, content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 409)
+        self.client.force_login(self.user)
+        response = self.client.post(f'/my-tasks/{self.task.pk}/update/', {'status': 'Pending', 'version': 0})
+        self.assertEqual(response.status_code, 409)
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.status, self.task.version), ('Completed', 1))
+
+    def test_bulk_updates_lose_to_a_concurrent_save(self):
+        is_valid = TaskUpdateSerializer.is_valid
+
+        def save_meanwhile(serializer, *args, **kwargs):
+            theirs = Task.objects.get(pk=self.task.pk)
+            theirs.status = 'In Progress'
+            theirs.save()
+            return is_valid(serializer, *args, **kwargs)
+
+        with mock.patch.object(TaskUpdateSerializer, 'is_valid', autospec=True, side_effect=save_meanwhile):
+            response = self.client.post('/tasks/bulk/', [{'id': self.task.pk, 'status': 'Pending'}], content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.json()['results'][0]['errors'], {'version': [VersionConflict.default_detail]})
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.status, self.task.version), ('In Progress', 2))
+
+
+class TaskBulkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('bulk_admin')
+        cls.admin.groups.add(role_group_id('Admin'))
+        cls.member, cls.outsider = User.objects.create_user('bulk_member'), User.objects.create_user('bulk_outsider')
+        for user in (cls.member, cls.outsider):
+            user.groups.add(role_group_id('User'))
+        cls.admin.managed_users.add(cls.member.userprofile)
+        cls.task = Task.objects.create(title='Batched', description='', due_date='2025-01-01', assigned_to=cls.member)
+
+    def post(self, user, items):
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {issue_token(user).access_token}'}
+        return self.client.post('/tasks/bulk/', items, content_type='application/json', **auth)
+
+    def new_task(self, assignee, **fields):
+        return {'title': 'New', 'description': 'Batched', 'assigned_to': assignee.pk, 'due_date': '2025-01-02', **fields}
+
+    def test_mixed_batch_creates_and_updates(self):
+        response = self.post(self.admin, [{'id': self.task.pk, 'status': 'In Progress'}, self.new_task(self.member)])
+        self.assertEqual(response.status_code, 200)
+        updated, created = response.json()['results']
+        self.assertEqual((updated['status'], created['status']), ('updated', 'created'))
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.status, self.task.version), ('In Progress', 2))
+        self.assertEqual(Task.objects.get(pk=created['id']).assigned_to, self.member)
+
+    def test_item_errors_are_reported_per_item_with_207(self):
+        response = self.post(self.admin, [
+            self.new_task(self.outsider),
+            {'id': self.task.pk, 'status': 'Completed', 'completion_report': 'Done', 'worked_hours': 1},
+            {'id': self.task.pk, 'status': 'Pending'},
+            {'id': True, 'status': 'Pending'},
+        ])
+        self.assertEqual(response.status_code, 207)
+        results = response.json()['results']
+        self.assertIn('assigned_to', results[0]['errors'])
+        self.assertEqual(results[1]['status'], 'updated')
+        self.assertEqual(results[2]['errors'], {'id': ['Duplicate id in batch.']})
+        self.assertEqual(results[3]['errors'], {'id': ['Not found.']})
+        self.assertEqual(Task.objects.get(pk=self.task.pk).status, 'Completed')
+        self.assertFalse(Task.objects.filter(assigned_to=self.outsider).exists())
+
+    def test_users_cannot_create(self):
+        response = self.post(self.member, [self.new_task(self.member), {'id': self.task.pk, 'status': 'In Progress'}])
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([result['status'] for result in response.json()['results']], ['error', 'updated'])
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_batch_size_is_limited(self):
+        with mock.patch('tasks.views.TaskBulkView.max_batch_size', 2):
+            response = self.post(self.admin, [self.new_task(self.member)] * 3)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Task.objects.count(), 1)
+
+
+class TombstoneRetentionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('tombstone_user')
+        cls.user.groups.add(role_group_id('User'))
+        cls.task = Task.objects.create(title='Kept', description='', due_date='2025-01-01', assigned_to=cls.user)
+        gone = Task.objects.create(title='Gone', description='', due_date='2025-01-01', assigned_to=cls.user)
+        cls.gone_id = gone.pk
+        gone.delete()
+
+    def changes(self, since):
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {issue_token(self.user).access_token}'}
+        cursor = str(int(since.timestamp() * 1_000_000))
+        return self.client.get('/tasks/changes/', {'since': cursor}, **auth).json()
+
+    def test_old_cursors_get_a_full_resync(self):
+        recent = self.changes(timezone.now() - timedelta(days=1))
+        self.assertEqual((recent['reset'], recent['deleted']), (False, [self.gone_id]))
+        with self.settings(TOMBSTONE_RETENTION_DAYS=1):
+            old = self.changes(timezone.now() - timedelta(days=2))
+        self.assertEqual((old['reset'], old['deleted']), (True, []))
+        self.assertEqual([task['id'] for task in old['changed']], [self.task.pk])
+
+    def test_prune_keeps_tombstones_inside_the_window(self):
+        TaskTombstone.objects.create(user=self.user, task_id=0)
+        TaskTombstone.objects.filter(task_id=0).update(deleted_at=timezone.now() - timedelta(days=31))
+        call_command('prune_tombstones', stdout=StringIO())
+        self.assertEqual(list(TaskTombstone.objects.values_list('task_id', flat=True)), [self.gone_id])
+
+
+class RollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.superadmin = User.objects.create_user('rollup_super')
+        cls.superadmin.groups.add(role_group_id('SuperAdmin'))
+        cls.admin = User.objects.create_user('rollup_admin')
+        cls.admin.groups.add(role_group_id('Admin'))
+        cls.members = [User.objects.create_user(f'rollup_member_{n}') for n in range(2)]
+        cls.outsider = User.objects.create_user('rollup_outsider')
+        for user in (*cls.members, cls.outsider):
+            user.groups.add(role_group_id('User'))
+        cls.admin.managed_users.add(*(user.userprofile for user in cls.members))
+
+    def create(self, user, due_date, **fields):
+        return Task.objects.create(title='Rolled', description='', due_date=due_date, assigned_to=user, **fields)
+
+    def rows(self):
+        return set(
+            TaskRollup.objects.exclude(task_count=0, worked_hours=0)
+            .values_list('user_id', 'status', 'day', 'task_count', 'worked_hours')
+        )
+
+    def assertInStep(self):
+        maintained = self.rows()
+        rollups.rebuild()
+        self.assertEqual(maintained, self.rows())
+
+    def dashboard(self, viewer, **params):
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {issue_token(viewer).access_token}'}
+        return self.client.get('/tasks/dashboard/', params, **auth).json()
+
+    def test_signals_keep_the_rollups_equal_to_a_rebuild(self):
+        first, second = self.members
+        task = self.create(first, '2025-01-01')
+        moved = self.create(second, '2025-01-02', status='Completed', completion_report='Done', worked_hours=3)
+        gone = self.create(self.outsider, '2025-01-01')
+        self.assertInStep()
+        task.status, task.completion_report, task.worked_hours = 'Completed', 'Done', 2
+        task.save()
+        self.assertInStep()
+        moved.assigned_to = first
+        moved.save()
+        self.assertInStep()
+        gone.delete()
+        self.assertInStep()
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {issue_token(self.admin).access_token}'}
+        response = self.client.post('/tasks/bulk/', [
+            {'id': task.pk, 'status': 'In Progress'},
+            {'title': 'Batched', 'description': 'Rolled', 'assigned_to': second.pk, 'due_date': '2025-01-03',
+             'status': 'Completed', 'completion_report': 'Done', 'worked_hours': 5},
+        ], content_type='application/json', **auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertInStep()
+        second.delete()
+        self.assertInStep()
+
+    def test_dashboard_is_scoped_and_filtered_by_day(self):
+        first, second = self.members
+        self.create(first, '2025-01-01')
+        self.create(second, '2025-01-02', status='Completed', completion_report='Done', worked_hours=4)
+        self.create(self.outsider, '2025-01-02')
+        team = self.dashboard(self.admin)
+        self.assertEqual({row['user'] for row in team['users']}, {first.pk, second.pk})
+        self.assertEqual(team['totals']['Pending']['tasks'], 1)
+        everyone = self.dashboard(self.superadmin)
+        self.assertEqual({row['user'] for row in everyone['users']}, {first.pk, second.pk, self.outsider.pk})
+        day = self.dashboard(self.superadmin, start='2025-01-02', end='2025-01-02')
+        self.assertEqual({row['user'] for row in day['users']}, {second.pk, self.outsider.pk})
+        self.assertEqual(day['totals']['Completed'], {'tasks': 1, 'worked_hours': 4})
+        self.assertEqual(self.dashboard(self.superadmin, end='2025-01-01')['users'],
+                         [{'user': first.pk, 'username': first.username, 'status': 'Pending', 'tasks': 1, 'worked_hours': 0}])
+        self.assertEqual(self.client.get('/tasks/dashboard/', {'start': 'soon'},
+                                         HTTP_AUTHORIZATION=f'Bearer {issue_token(self.admin).access_token}').status_code, 400)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.superadmin = User.objects.create_user('search_super')
+        cls.superadmin.groups.add(role_group_id('SuperAdmin'))
+        cls.admin = User.objects.create_user('search_admin')
+        cls.admin.groups.add(role_group_id('Admin'))
+        cls.member, cls.outsider = User.objects.create_user('search_member'), User.objects.create_user('search_outsider')
+        for user in (cls.member, cls.outsider):
+            user.groups.add(role_group_id('User'))
+        cls.admin.managed_users.add(cls.member.userprofile)
+        cls.in_title = cls.create(cls.member, title='Quarterly budget')
+        cls.in_description = cls.create(cls.member, description='Review the budget numbers')
+        cls.in_report = cls.create(cls.outsider, status='Completed', completion_report='Budgeting done', worked_hours=1)
+
+    @staticmethod
+    def create(user, title='Task', description='Plain', **fields):
+        return Task.objects.create(title=title, description=description, due_date='2025-01-01', assigned_to=user, **fields)
+
+    def found(self, query, queryset=None):
+        return list(search_tasks(Task.objects.all() if queryset is None else queryset, query))
+
+    def test_words_match_prefixes_in_every_column_with_titles_first(self):
+        matches = self.found('budg')
+        self.assertEqual(matches[0], self.in_title)
+        self.assertEqual(set(matches), {self.in_title, self.in_description, self.in_report})
+        self.assertEqual(self.found('quart budg'), [self.in_title])
+        self.assertEqual(self.found('???'), [])
+
+    def test_bulk_writes_keep_the_index_in_step(self):
+        created = Task.objects.bulk_create([
+            Task(title='Zephyr launch', description='', due_date='2025-01-01', assigned_to=self.member),
+        ])
+        self.assertEqual(self.found('zeph'), created)
+        Task.objects.filter(pk=created[0].pk).update(title='Xylophone launch')
+        self.assertEqual(self.found('zeph'), [])
+        self.assertEqual(self.found('xylo'), created)
+        Task.objects.filter(pk=created[0].pk).delete()
+        self.assertEqual(self.found('xylo'), [])
+
+    def test_endpoint_only_searches_visible_tasks(self):
+        def ids(viewer):
+            auth = {'HTTP_AUTHORIZATION': f'Bearer {issue_token(viewer).access_token}'}
+            return {task['id'] for task in self.client.get('/tasks/search/', {'q': 'budget'}, **auth).json()}
+
+        team = {self.in_title.pk, self.in_description.pk}
+        self.assertEqual(ids(self.member), team)
+        self.assertEqual(ids(self.admin), team)
+        self.assertEqual(ids(self.outsider), {self.in_report.pk})
+        self.assertEqual(ids(self.superadmin), team | {self.in_report.pk})
+
+
+class SearchIndexMigrationTests(TransactionTestCase):
+    # The rebuild below can't run inside a test transaction; keep the role
+    # groups the migrations created for the tests that follow
+    serialized_rollback = True
+
+    def triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'tasks_task'")
+            return {name for name, in cursor.fetchall()}
+
+    def test_install_restores_the_triggers_a_table_rebuild_drops(self):
+        user = User.objects.create_user('rebuild_user')
+        Task.objects.create(title='Before', description='', due_date='2025-01-01', assigned_to=user)
+        installed = self.triggers()
+        title = Task._meta.get_field('title')
+        wider = copy.copy(title)
+        wider.max_length = title.max_length + 1
+        with connection.schema_editor() as editor:
+            editor.alter_field(Task, title, wider)
+        try:
+            self.assertEqual(self.triggers(), set())
+            Task.objects.create(title='During', description='', due_date='2025-01-01', assigned_to=user)
+            call_command('migrate', 'tasks', verbosity=0)
+            self.assertEqual(self.triggers(), installed)
+            self.assertEqual([task.title for task in search_tasks(Task.objects.all(), 'during')], ['During'])
+        finally:
+            with connection.schema_editor() as editor:
+                editor.alter_field(Task, wider, title)
+            search.install(connection)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.superadmin = User.objects.create_user('keyset_super')
+        cls.superadmin.groups.add(role_group_id('SuperAdmin'))
+        user = User.objects.create_user('keyset_user')
+        # Ties on the key are broken by pk
+        cls.tasks = [
+            Task.objects.create(title=f'Paged {n}', description='', due_date=due_date, assigned_to=user,
+                                status='Pending' if n % 2 else 'In Progress')
+            for n, due_date in enumerate(['2025-01-01'] + ['2025-01-02'] * 5 + ['2025-01-03'])
+        ]
+
+    def paginator(self):
+        return KeysetPaginator(Task.objects.all(), 'due_date', 2)
+
+    def test_after_visits_every_row_once_and_before_goes_back(self):
+        paginator = self.paginator()
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(after=pages[-1].next_cursor))
+        self.assertEqual([task for page in pages for task in page], self.tasks)
+        self.assertFalse(pages[0].has_previous())
+        for previous, page in zip(pages, pages[1:]):
+            self.assertEqual(list(paginator.page(before=page.previous_cursor)), list(previous))
+
+    def test_malformed_cursors_give_the_first_page(self):
+        first = list(self.paginator().page())
+        for cursor in ('garbage', '2025-13-01~1', '2025-01-02~x'):
+            self.assertEqual(list(self.paginator().page(after=cursor)), first)
+        self.client.force_login(self.superadmin)
+        self.assertEqual(self.client.get('/admin/tasks/', {'after': 'garbage', 'before': '~'}).status_code, 200)
+
+    def test_page_links_keep_the_filters(self):
+        self.client.force_login(self.superadmin)
+        with mock.patch('tasks.admin_views.TaskListAdminView.paginate_by', 2):
+            page = self.client.get('/admin/tasks/', {'status': 'Pending'})
+            next_link = re.search(r'href="\?(status=Pending&amp;after=[^"]+)"', page.content.decode())
+            self.assertIsNotNone(next_link)
+            second = self.client.get('/admin/tasks/?' + next_link.group(1).replace('&amp;', '&'))
+        content = second.content.decode()
+        self.assertIn('href="?status=Pending&amp;before=', content)
+        self.assertIn('href="?status=Pending">First</a>', content)
+        shown = [task for task in self.tasks if task.status == 'Pending'][2:4]
+        for task in shown:
+            self.assertIn(task.title, content)
+
+
+class BulkAssignTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.superadmin = User.objects.create_user('assign_super')
+        cls.superadmin.groups.add(role_group_id('SuperAdmin'))
+        cls.admins = [User.objects.create_user(f'assign_admin_{n}') for n in range(2)]
+        cls.users = [User.objects.create_user(f'assign_user_{n}') for n in range(3)]
+        for admin in cls.admins:
+            admin.groups.add(role_group_id('Admin'))
+        for user in cls.users:
+            user.groups.add(role_group_id('User'))
+
+    def post(self, viewer, action, admin, users, **extra):
+        self.client.force_login(viewer)
+        return self.client.post('/admin/users/assign/bulk/', {
+            'action': action, 'admin': admin.pk, 'users': [user.pk for user in users], **extra,
+        })
+
+    def team(self, admin):
+        return set(users_for(admin))
+
+    def test_assign_and_unassign_many_users(self):
+        first, second = self.admins
+        response = self.post(self.superadmin, 'assign', first, self.users)
+        self.assertRedirects(response, '/admin/users/assign/', fetch_redirect_response=False)
+        self.assertEqual(self.team(first), set(self.users))
+        response = self.post(self.superadmin, 'unassign', first, self.users[:2], next=f'admin={first.pk}&page=2')
+        self.assertEqual(response['Location'], f'/admin/users/assign/?admin={first.pk}&page=2')
+        self.assertEqual(self.team(first), {self.users[2]})
+        self.assertEqual(self.team(second), set())
+
+    def test_return_query_is_rebuilt_from_the_list_params(self):
+        response = self.post(self.superadmin, 'assign', self.admins[0], self.users[:1],
+                             next='page=3&next=//evil.example\r\nSet-Cookie: x=1&admin=x')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], '/admin/users/assign/?page=3')
+
+    def test_admins_cannot_assign(self):
+        first, second = self.admins
+        second.managed_users.add(self.users[0].userprofile)
+        response = self.post(first, 'assign', first, self.users)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.team(first), set())
+        self.assertEqual(self.post(first, 'unassign', second, self.users[:1]).status_code, 403)
+        self.assertEqual(self.team(second), {self.users[0]})
+
+
+class TaskExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.superadmin = User.objects.create_user('export_super')
+        cls.superadmin.groups.add(role_group_id('SuperAdmin'))
+        cls.admin = User.objects.create_user('export_admin')
+        cls.admin.groups.add(role_group_id('Admin'))
+        cls.member, cls.outsider = User.objects.create_user('export_member'), User.objects.create_user('export_outsider')
+        cls.admin.managed_users.add(cls.member.userprofile)
+        cls.done = Task.objects.create(
+            title='Shipped, "v2"', description='Line one\nline two', due_date='2025-01-01', assigned_to=cls.member,
+            status='Completed', completion_report='Done', worked_hours=3,
+        )
+        cls.open = Task.objects.create(title='Open', description='', due_date='2025-01-02', assigned_to=cls.member)
+        cls.hidden = Task.objects.create(title='Hidden', description='', due_date='2025-01-03', assigned_to=cls.outsider)
+
+    def export(self, viewer, **params):
+        self.client.force_login(viewer)
+        response = self.client.get('/admin/tasks/export/', params)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_has_a_header_and_a_row_per_task(self):
+        response, body = self.export(self.superadmin)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="tasks.csv"')
+        rows = list(csv.reader(StringIO(body)))
+        self.assertEqual(rows[0], ['id', 'title', 'description', 'assigned_to', 'due_date', 'status', 'completion_report', 'worked_hours'])
+        self.assertEqual(rows[1], [str(self.done.pk), 'Shipped, "v2"', 'Line one\nline two', 'export_member', '2025-01-01', 'Completed', 'Done', '3'])
+        self.assertEqual([row[0] for row in rows[1:]], [str(task.pk) for task in (self.done, self.open, self.hidden)])
+
+    def test_ndjson_has_an_object_per_line(self):
+        response, body = self.export(self.superadmin, format='ndjson', status='Pending')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="tasks.ndjson"')
+        self.assertEqual([json.loads(line) for line in body.splitlines()], [
+            {'id': self.open.pk, 'title': 'Open', 'description': '', 'assigned_to': 'export_member', 'due_date': '2025-01-02',
+             'status': 'Pending', 'completion_report': None, 'worked_hours': None},
+            {'id': self.hidden.pk, 'title': 'Hidden', 'description': '', 'assigned_to': 'export_outsider',
+             'due_date': '2025-01-03', 'status': 'Pending', 'completion_report': None, 'worked_hours': None},
+        ])
+
+    def test_export_applies_the_panel_filters_and_scoping(self):
+        def ids(viewer, **params):
+            return [json.loads(line)['id'] for line in self.export(viewer, format='ndjson', **params)[1].splitlines()]
+
+        self.assertEqual(ids(self.admin), [self.done.pk, self.open.pk])
+        self.assertEqual(ids(self.admin, user='EXPORT_OUTSIDER'), [])
+        self.assertEqual(ids(self.superadmin, user='export_outsider'), [self.hidden.pk])
+        self.assertEqual(ids(self.superadmin, q='shipp'), [self.done.pk])
+        self.client.force_login(self.superadmin)
+        self.assertEqual(self.client.get('/admin/tasks/export/', {'format': 'xml'}).status_code, 400)
+
+
+class FastSerializerParityTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('parity_user')
+        Task.objects.create(title='Plain', description='', due_date='2025-01-01', assigned_to=user)
+        Task.objects.create(
+            title='Tricky "quotes" \\ / caf\u00e9 \U0001f600', description='line\nbreak \u2028 \u2029 \x00 \x1f',
+            due_date='1999-12-31', status='Completed', completion_report='<b>done</b>', worked_hours=0,
+            assigned_to=user,
+        )
+        # Whole seconds render without a fraction
+        Task.objects.filter(title='Plain').update(created_at=timezone.now().replace(microsecond=0))
+
+    def assertParity(self):
+        queryset = Task.objects.order_by('pk')
+        expected = TaskSerializer(queryset, many=True).data
+        fast = TaskValuesSerializer(queryset).data
+        self.assertEqual([list(row.items()) for row in fast], [list(row.items()) for row in expected])
+        self.assertEqual(FastJSONRenderer().render(fast), JSONRenderer().render(expected))
+
+    def test_matches_task_serializer(self):
+        self.assertParity()
+
+    def test_matches_task_serializer_in_another_time_zone(self):
+        with timezone.override('Asia/Kolkata'):
+            self.assertParity()
+
+    def test_sparse_fields_keep_the_serializer_order(self):
+        queryset = Task.objects.order_by('pk')
+        expected = [[('id', row['id']), ('status', row['status'])] for row in TaskSerializer(queryset, many=True).data]
+        self.assertEqual([list(row.items()) for row in TaskValuesSerializer(queryset, ['status', 'id']).data], expected)
+        with self.assertRaises(ValidationError):
+            TaskValuesSerializer(queryset, ['id', 'password'])
@@ -0,0 +1,53 @@
+"""
+Per-user token versions.
+
+Every API token carries the version its user had when it was issued. Bumping
+the version (on password change, deactivation, role change) makes all older
+tokens fail authentication, so tokens can trust the roles they carry.
+"""
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import UserProfile
+
+# Revocation deletes the cached version, which every worker sees as long as
+# CACHES['default'] is shared between them (see DJANGO_CACHE_DIR).
+TOKEN_VERSION_CACHE_TIMEOUT = 60
+
+# Cached for users without a profile, so they can't be looked up repeatedly
+MISSING = -1
+
+
+def _cache_key(user_id):
+    return f'tasks:token_version:{user_id}'
+
+
+def get_token_version(user_id):
+    """The user's current token version, or ``MISSING`` if the user is gone."""
+    key = _cache_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = UserProfile.objects.filter(user_id=user_id).values_list('token_version', flat=True).first()
+        version = MISSING if version is None else version
+        cache.set(key, version, TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+async def aget_token_version(user_id):
+    key = _cache_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        version = await UserProfile.objects.filter(user_id=user_id).values_list('token_version', flat=True).afirst()
+        version = MISSING if version is None else version
+        await cache.aset(key, version, TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
+
+
+def revoke_tokens(*user_ids):
+    """Invalidate every token issued so far to ``user_ids``."""
+    UserProfile.objects.filter(user_id__in=user_ids).update(token_version=F('token_version') + 1)
+    forget_token_versions(*user_ids)
+
+
+def forget_token_versions(*user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
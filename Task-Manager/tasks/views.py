@@ -1,24 +1,58 @@
 # Generic task detail view for all roles
+import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
 from django.views.generic import DetailView, ListView, UpdateView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Sum
+from django.utils.dateparse import parse_date
+from django.utils import timezone
+from django.utils.http import quote_etag
 
-from rest_framework import generics, permissions
+from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
 
-from .models import Task, UserProfile
-from .serializers import TaskSerializer, TaskUpdateSerializer, TaskReportSerializer
+from core.replicas import pin_primary
+
+from . import caching
+from .conditional import (
+    ConditionalGetMixin, PreconditionFailed, VersionConflict, VersionedUpdateMixin, check_preconditions, task_etag,
+)
+from .events import user_channel
+from .models import Task, TaskRollup, TaskTombstone, UserProfile
+from .serializers import TaskSerializer, TaskUpdateSerializer, TaskReportSerializer, TaskBulkCreateSerializer, TaskValuesSerializer, requested_fields
 from .forms import TaskForm
+from .roles import get_roles, has_role
+from .scoping import tasks_for, users_for
+from .search import search_tasks
+from .signals import task_batch_saved
 
 
 # Task Detail View (generic)
-class TaskDetailView(LoginRequiredMixin, DetailView):
+class TaskDetailView(LoginRequiredMixin, ConditionalGetMixin, caching.CachedFragmentMixin, DetailView):
     model = Task
     template_name = 'task_detail.html'
+    fragment_template_name = 'task_detail_card.html'
     context_object_name = 'task'
 
+    def get_etag(self):
+        # The page around the card shows the viewer's menu and a link back
+        page = hashlib.sha256(repr((sorted(get_roles(self.request.user)), self.request.META.get('HTTP_REFERER'))).encode())
+        return f'{task_etag(self.get_object())}-{page.hexdigest()[:16]}'
+
+    def get_last_modified(self):
+        return self.get_object().updated_at
+
+    def get_cache_scope(self):
+        # Whoever views it, the card changes with its assignee's tasks
+        return user_channel(self.object.assigned_to_id)
+
+    def get_cache_key(self):
+        return (self.fragment_template_name, self.object.pk)
+
 
 # User Profile View
 class UserProfileView(LoginRequiredMixin, DetailView):
@@ -39,68 +73,335 @@ class IsAuthenticatedAndUser(permissions.BasePermission):
         return (
             request.user
             and request.user.is_authenticated
-            and request.user.groups.filter(name='User').exists()
+            and has_role(request.user, 'User')
         )
 
 
 class IsAdminOrSuperAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
-        return request.user.groups.filter(name__in=['Admin', 'SuperAdmin']).exists()
+        return has_role(request.user, 'Admin', 'SuperAdmin')
 
 
 # API Views
-class TaskListView(generics.ListAPIView):
+class TaskListView(ConditionalGetMixin, generics.ListAPIView):
+    """The caller's tasks; ``?fields=id,title,status`` returns only those fields."""
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticatedAndUser]
 
     def get_queryset(self):
         return Task.objects.filter(assigned_to=self.request.user)
 
+    def get_values_serializer(self):
+        return TaskValuesSerializer(self.get_queryset(), requested_fields(self.request.query_params))
+
+    def get_etag(self):
+        scope = user_channel(self.request.user.pk)
+        etag = f'{scope}-{caching.get_version(scope)}'
+        if requested_fields(self.request.query_params):
+            etag += '-' + '.'.join(self.get_values_serializer().columns)
+        return etag
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_values_serializer()
+        data = caching.cached(user_channel(request.user.pk), ('api:tasks', serializer.columns), lambda: serializer.data)
+        return Response(data)
+
+
+class TaskSearchView(generics.ListAPIView):
+    """Full-text search over the tasks the caller can see, best matches first."""
+    serializer_class = TaskSerializer
+    permission_classes = [IsAuthenticatedAndUser | IsAdminOrSuperAdmin]
+    default_limit = 50
+    max_limit = 200
+
+    def get_queryset(self):
+        try:
+            limit = min(int(self.request.query_params.get('limit', self.default_limit)), self.max_limit)
+        except ValueError:
+            limit = self.default_limit
+        query = self.request.query_params.get('q', '')
+        return search_tasks(tasks_for(self.request.user), query)[:max(limit, 1)]
+
+
+class TaskChangesView(generics.GenericAPIView):
+    """
+    Delta sync for the caller's tasks.
+
+    Without ``since`` every task is returned. With the ``cursor`` from a
+    previous response only tasks created or changed since then are returned,
+    plus the ids of tasks that were deleted or reassigned away. A cursor older
+    than the tombstone retention gets every task again with ``reset`` set, as
+    the deletes since then may have been pruned. ``fields`` works as on the
+    task list.
+    """
+    serializer_class = TaskSerializer
+    permission_classes = [IsAuthenticatedAndUser]
+    # Cursors are moved back a little so a write that was stamped just
+    # before the cursor but committed after this read is not missed.
+    cursor_overlap = timedelta(seconds=2)
+
+    def get(self, request, *args, **kwargs):
+        # A replica lagging by more than the overlap would leave out writes
+        # stamped before the cursor, and no later sync would return them
+        with pin_primary():
+            return self.changes(request)
+
+    def changes(self, request):
+        cursor = timezone.now() - self.cursor_overlap
+        tasks = Task.objects.filter(assigned_to=request.user)
+        deleted = TaskTombstone.objects.none()
+        reset = False
+        since = request.query_params.get('since')
+        if since:
+            try:
+                since = datetime.fromtimestamp(int(since) / 1_000_000, tz=dt_timezone.utc)
+            except (ValueError, OverflowError, OSError):
+                return Response({'since': ['Invalid cursor.']}, status=status.HTTP_400_BAD_REQUEST)
+            if since < TaskTombstone.retention_cutoff():
+                reset = True
+            else:
+                tasks = tasks.filter(updated_at__gte=since)
+                deleted = TaskTombstone.objects.filter(user=request.user, deleted_at__gte=since)
+        return Response({
+            'cursor': str(int(cursor.timestamp() * 1_000_000)),
+            'reset': reset,
+            'changed': TaskValuesSerializer(tasks, requested_fields(request.query_params)).data,
+            'deleted': sorted(set(deleted.values_list('task_id', flat=True))),
+        })
+
 
 class TaskUpdateView(generics.UpdateAPIView):
+    """
+    Update one of the caller's tasks. With ``If-Match`` (the ``ETag`` of the
+    task's report or of a previous update) the write only goes ahead if
+    nobody has changed the task since; otherwise the answer is 412. A
+    ``version`` in the body is checked the same way, and a write that loses a
+    race with another one is answered with 409 instead of overwriting it.
+    """
     serializer_class = TaskUpdateSerializer
     permission_classes = [IsAuthenticatedAndUser]
 
     def get_queryset(self):
         return Task.objects.filter(assigned_to=self.request.user)
 
+    def get_object(self):
+        task = super().get_object()
+        if check_preconditions(self.request, task_etag(task), task.updated_at) is not None:
+            raise PreconditionFailed()
+        return task
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        response['ETag'] = quote_etag(task_etag(self.updated_task))
+        return response
+
     def perform_update(self, serializer):
-        instance = serializer.save()
-        if instance.status != 'Completed':
-            instance.completion_report = None
-            instance.worked_hours = None
-            instance.save()
+        # One conditional UPDATE, with the completion rules already applied
+        self.updated_task = serializer.save()
+
+
+class TaskBulkView(generics.GenericAPIView):
+    """
+    Create and partially update many tasks in one request.
+
+    The body is a JSON array. Items with an ``id`` are partial updates of
+    ``status``/``completion_report``/``worked_hours``; items without one are
+    creates (Admin/SuperAdmin only). Every item is validated like the
+    single-task endpoints, valid items are written with one bulk_create and
+    one bulk_update inside a single transaction, and the response carries a
+    result per item in request order.
+    """
+    permission_classes = [IsAuthenticatedAndUser | IsAdminOrSuperAdmin]
+    max_batch_size = 1000
+    update_fields = ['status', 'completion_report', 'worked_hours', 'updated_at', 'version']
+
+    def get_queryset(self):
+        return tasks_for(self.request.user)
+
+    def post(self, request, *args, **kwargs):
+        items = request.data
+        if not isinstance(items, list):
+            return Response({'detail': 'Expected a list of items.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.max_batch_size:
+            return Response(
+                {'detail': f'A batch can contain at most {self.max_batch_size} items.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        update_ids = [item['id'] for item in items if isinstance(item, dict) and type(item.get('id')) is int]
+        instances = self.get_queryset().in_bulk(update_ids)
+        can_create = has_role(request.user, 'Admin', 'SuperAdmin')
+        assignee_ids = [item.get('assigned_to') for item in items if isinstance(item, dict) and 'id' not in item]
+        assignable_ids = set()
+        if can_create and assignee_ids:
+            assignable_ids = set(
+                users_for(request.user).filter(pk__in=[pk for pk in assignee_ids if type(pk) is int])
+                .values_list('pk', flat=True)
+            )
+
+        results = []
+        to_create, to_update, seen_ids = [], [], set()
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results.append({'index': index, 'status': 'error', 'errors': {'non_field_errors': ['Expected an object.']}})
+                continue
+            if 'id' in item:
+                task = instances.get(item['id']) if type(item['id']) is int else None
+                if task is None or task.pk in seen_ids:
+                    detail = 'Not found.' if task is None else 'Duplicate id in batch.'
+                    results.append({'index': index, 'id': item['id'], 'status': 'error', 'errors': {'id': [detail]}})
+                    continue
+                serializer = TaskUpdateSerializer(task, data=item, partial=True)
+                if not serializer.is_valid():
+                    results.append({'index': index, 'id': task.pk, 'status': 'error', 'errors': serializer.errors})
+                    continue
+                data = dict(serializer.validated_data)
+                if data.pop('version', task.version) != task.version:
+                    results.append({'index': index, 'id': task.pk, 'status': 'error', 'errors': {'version': [VersionConflict.default_detail]}})
+                    continue
+                for attr, value in data.items():
+                    setattr(task, attr, value)
+                task.apply_completion_rules()
+                seen_ids.add(task.pk)
+                to_update.append((task, len(results)))
+                results.append({'index': index, 'id': task.pk, 'status': 'updated'})
+            else:
+                if not can_create:
+                    results.append({'index': index, 'status': 'error', 'errors': {'non_field_errors': ['You do not have permission to create tasks.']}})
+                    continue
+                serializer = TaskBulkCreateSerializer(data=item, context={'assignable_ids': assignable_ids})
+                if not serializer.is_valid():
+                    results.append({'index': index, 'status': 'error', 'errors': serializer.errors})
+                    continue
+                data = dict(serializer.validated_data)
+                task = Task(assigned_to_id=data.pop('assigned_to'), **data)
+                task.apply_completion_rules()
+                to_create.append((task, len(results)))
+                results.append({'index': index, 'status': 'created'})
+
+        # bulk_update() skips auto_now, so stamp the rows ourselves
+        now = timezone.now()
+        with transaction.atomic():
+            # Re-read the versions under the write lock: a task saved since
+            # it was loaded above is reported as a conflict, not overwritten.
+            current = dict(
+                Task.objects.select_for_update().filter(pk__in=[task.pk for task, _ in to_update])
+                .values_list('pk', 'version')
+            )
+            updated = []
+            for task, position in to_update:
+                if current.get(task.pk) != task.version:
+                    results[position] = {
+                        'index': results[position]['index'], 'id': task.pk, 'status': 'error',
+                        'errors': {'version': [VersionConflict.default_detail]},
+                    }
+                    continue
+                task.updated_at = now
+                task.version += 1
+                updated.append(task)
+            created = Task.objects.bulk_create([task for task, _ in to_create], batch_size=500)
+            Task.objects.bulk_update(updated, self.update_fields, batch_size=500)
+            task_batch_saved.send(sender=Task, created=created, updated=updated)
+        for task in updated:
+            task.snapshot()
+        for task, position in to_create:
+            results[position]['id'] = task.pk
+
+        has_errors = any(result['status'] == 'error' for result in results)
+        return Response(
+            {'results': results},
+            status=status.HTTP_207_MULTI_STATUS if has_errors else status.HTTP_200_OK,
+        )
 
 
-class TaskReportView(generics.RetrieveAPIView):
+class TaskDashboardView(generics.GenericAPIView):
+    """
+    Task counts and worked hours per status and per user for the caller's team.
+
+    Reads only the ``TaskRollup`` table, so the cost depends on the number of
+    users and days in range rather than on the number of tasks. Optional
+    ``start``/``end`` (YYYY-MM-DD) limit the due dates included.
+    """
+    permission_classes = [IsAdminOrSuperAdmin]
+
+    def get(self, request, *args, **kwargs):
+        rollups = TaskRollup.objects.order_by()
+        if not has_role(request.user, 'SuperAdmin'):
+            rollups = rollups.filter(user__in=users_for(request.user))
+        for param, lookup in (('start', 'day__gte'), ('end', 'day__lte')):
+            if request.query_params.get(param):
+                try:
+                    day = parse_date(request.query_params[param])
+                except ValueError:
+                    day = None
+                if day is None:
+                    return Response({param: ['Invalid date.']}, status=status.HTTP_400_BAD_REQUEST)
+                rollups = rollups.filter(**{lookup: day})
+
+        totals = {value: {'tasks': 0, 'worked_hours': 0} for value, _ in Task.STATUS_CHOICES}
+        users = []
+        rows = (
+            rollups.values('user_id', 'user__username', 'status')
+            .annotate(tasks=Sum('task_count'), hours=Sum('worked_hours'))
+            .filter(tasks__gt=0)
+            .order_by('user__username', 'status')
+        )
+        for row in rows:
+            totals[row['status']]['tasks'] += row['tasks']
+            totals[row['status']]['worked_hours'] += row['hours']
+            users.append({
+                'user': row['user_id'],
+                'username': row['user__username'],
+                'status': row['status'],
+                'tasks': row['tasks'],
+                'worked_hours': row['hours'],
+            })
+        return Response({'totals': totals, 'users': users})
+
+
+class TaskReportView(ConditionalGetMixin, generics.RetrieveAPIView):
     serializer_class = TaskReportSerializer
     permission_classes = [IsAdminOrSuperAdmin]
+    queryset = Task.objects.all()
 
     def get_object(self):
-        task = get_object_or_404(Task, pk=self.kwargs['pk'])
+        task = super().get_object()
         if task.status != 'Completed':
             raise PermissionDenied("Report only available for completed tasks.")
         return task
 
+    def get_etag(self):
+        return task_etag(self.get_object())
+
+    def get_last_modified(self):
+        return self.get_object().updated_at
+
 
 # User-facing: List their own tasks
-class UserTaskListView(LoginRequiredMixin, ListView):
+class UserTaskListView(LoginRequiredMixin, caching.CachedFragmentMixin, ListView):
     model = Task
     template_name = 'tasks_list_user.html'
+    fragment_template_name = 'tasks_list_user_table.html'
+    cache_params = ('status',)
     context_object_name = 'object_list'
 
     def get_queryset(self):
-        return Task.objects.filter(assigned_to=self.request.user)
+        # The list shows descriptions but never reports
+        return Task.objects.filter(assigned_to=self.request.user).defer('completion_report')
+
+    def get_cache_scope(self):
+        return user_channel(self.request.user.pk)
 
 
 # User-facing: Update their own task
-class UserTaskUpdateView(LoginRequiredMixin, UpdateView):
+class UserTaskUpdateView(LoginRequiredMixin, VersionedUpdateMixin, UpdateView):
     model = Task
-    fields = ['status', 'completion_report', 'worked_hours']
+    fields = ['status', 'completion_report', 'worked_hours', 'version']
     template_name = 'task_update_user.html'
     success_url = reverse_lazy('tasks_list_user')
 
     def get_queryset(self):
+        # Other users' tasks are a 404, so the form needs no ownership check
         return Task.objects.filter(assigned_to=self.request.user)
 
     def get_form(self, form_class=None):
@@ -109,12 +410,7 @@ class UserTaskUpdateView(LoginRequiredMixin, UpdateView):
         class UserTaskForm(forms.ModelForm):
             class Meta:
                 model = Task
-                fields = ['status', 'completion_report', 'worked_hours']
+                fields = ['status', 'completion_report', 'worked_hours', 'version']
+                widgets = {'version': forms.HiddenInput()}
 
         return UserTaskForm(**self.get_form_kwargs())
-
-    def form_valid(self, form):
-        if self.get_object().assigned_to != self.request.user:
-            form.add_error(None, "You do not have permission to update this task.")
-            return self.form_invalid(form)
-        return super().form_valid(form)
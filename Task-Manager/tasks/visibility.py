@@ -0,0 +1,49 @@
+"""
+Admin-to-user visibility index.
+
+``AdminVisibility`` mirrors ``UserProfile.managed_by`` with user ids on both
+sides, so team scoping needs neither the profile nor the through table. The
+signals in ``signals.py`` apply every change to ``managed_by``; writers that
+bypass them (raw SQL, bulk loads) must call ``rebuild()``.
+"""
+from django.db import connection, transaction
+
+from .models import AdminVisibility, UserProfile
+
+Link = UserProfile.managed_by.through
+
+
+def visible_user_ids(admin):
+    """Subquery of the ids of the users ``admin`` manages."""
+    return AdminVisibility.objects.filter(admin=admin).values('user_id')
+
+
+def add(pairs):
+    AdminVisibility.objects.bulk_create(
+        [AdminVisibility(admin_id=admin_id, user_id=user_id) for admin_id, user_id in pairs],
+        ignore_conflicts=True,
+    )
+
+
+def source_pairs():
+    """``(admin_id, user_id)`` pairs as ``managed_by`` holds them."""
+    return Link.objects.order_by().values_list('user_id', 'userprofile__user_id')
+
+
+def diff():
+    """Return the pairs missing from the index and the ones it should not have."""
+    expected = set(source_pairs())
+    actual = set(AdminVisibility.objects.values_list('admin_id', 'user_id'))
+    return expected - actual, actual - expected
+
+
+def rebuild():
+    """Recompute the index from ``managed_by`` in one INSERT ... SELECT."""
+    select_sql, params = source_pairs().distinct().query.sql_with_params()
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(AdminVisibility._meta.get_field(name).column) for name in ('admin', 'user'))
+    with transaction.atomic():
+        AdminVisibility.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(f'INSERT INTO {quote(AdminVisibility._meta.db_table)} ({columns}) {select_sql}', params)
+    return AdminVisibility.objects.count()
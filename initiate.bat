@@ -8,6 +8,12 @@ REM initiate.bat -r        -- Restart containers
 SETLOCAL ENABLEEXTENSIONS
 SET ARG=%1
 
+REM docker-compose reads DJANGO_SECRET_KEY from .env; create one on first use
+IF NOT EXIST .env (
+    echo Generating a secret key in .env...
+    powershell -NoProfile -Command "$b = New-Object byte[] 48; [Security.Cryptography.RandomNumberGenerator]::Create().GetBytes($b); 'DJANGO_SECRET_KEY=' + ([Convert]::ToBase64String($b) -replace '[+/=]', '') | Set-Content -Encoding ascii .env"
+)
+
 IF "%ARG%"=="-b" (
     echo Building Docker image and starting containers...
     docker-compose build
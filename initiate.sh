@@ -8,6 +8,12 @@
 
 set -e
 
+# docker-compose reads DJANGO_SECRET_KEY from .env; create one on first use
+if [[ ! -f .env ]]; then
+    echo "Generating a secret key in .env..."
+    echo "DJANGO_SECRET_KEY=$(LC_ALL=C tr -dc 'A-Za-z0-9' < /dev/urandom | head -c 50)" > .env
+fi
+
 if [[ "$1" == "-b" ]]; then
     echo "Building Docker image and starting containers..."
     docker-compose build